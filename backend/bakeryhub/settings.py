@@ -4,6 +4,7 @@ Django settings for bakeryhub project.
 Generated by 'django-admin startproject' using Django 5.2.7.
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta  # Import this at the top level
 
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,16 +70,57 @@ WSGI_APPLICATION = 'bakeryhub.wsgi.application'
 
 
 # Database
-DATABASES = {
-    'default': {
+# Environment driven (DB_*); the defaults are the local development database.
+# - DB_CONN_MAX_AGE: seconds a connection is kept for reuse across requests
+#   (persistent connections, checked before reuse by CONN_HEALTH_CHECKS).
+# - DB_POOL=1: use psycopg 3's connection pool instead (Django 5.1+, needs
+#   psycopg[pool]); persistent connections are then switched off, as Django requires.
+#   Prefer it under ASGI, where persistent connections are not reused between requests.
+# - DB_REPLICA_HOST: adds a 'replica' alias that the read-only views read from
+#   (core/routers.py). Other DB_REPLICA_* values fall back to the DB_* ones.
+def database_from_env(prefix, defaults, fallback_prefix=None):
+    def env(name, default):
+        value = os.environ.get(f'{prefix}{name}')
+        if value is None and fallback_prefix:
+            value = os.environ.get(f'{fallback_prefix}{name}')
+        return default if value is None else value
+
+    pool = env('POOL', '0') == '1'
+    config = {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'bakeryHUB',
-        'USER': 'postgres',
-        'PASSWORD': 'dW2001@C',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': env('NAME', defaults['NAME']),
+        'USER': env('USER', defaults['USER']),
+        'PASSWORD': env('PASSWORD', defaults['PASSWORD']),
+        'HOST': env('HOST', defaults['HOST']),
+        'PORT': env('PORT', defaults['PORT']),
+        'CONN_MAX_AGE': 0 if pool else int(env('CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
+    if pool:
+        config['OPTIONS']['pool'] = {
+            'min_size': int(env('POOL_MIN_SIZE', 2)),
+            'max_size': int(env('POOL_MAX_SIZE', 10)),
+            'timeout': float(env('POOL_TIMEOUT', 10)),
+        }
+    return config
+
+
+DATABASE_DEFAULTS = {
+    'NAME': 'bakeryHUB',
+    'USER': 'postgres',
+    'PASSWORD': 'dW2001@C',
+    'HOST': 'localhost',
+    'PORT': '5432',
 }
+DATABASES = {
+    'default': database_from_env('DB_', DATABASE_DEFAULTS),
+}
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = database_from_env('DB_REPLICA_', DATABASE_DEFAULTS, fallback_prefix='DB_')
+    # Tests read the replica alias from the primary test database
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['core.routers.ReadReplicaRouter']
 
 
 # Password validation
@@ -97,6 +140,109 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# core.hashers.TunedPBKDF2PasswordHasher hashes new passwords with
+# PASSWORD_HASH_ITERATIONS rounds; changing it rehashes each user on their next
+# login. The other hashers only verify hashes written elsewhere.
+PASSWORD_HASHERS = [
+    'core.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600_000))
+
+# Login throttling (core/ratelimit.py), checked before any hashing:
+# (attempts, window seconds) per client IP, (failed attempts, window seconds) per username
+LOGIN_RATE_LIMITS = {
+    'ip': (30, 60),
+    'username': (5, 300),
+}
+
+
+# Cache
+# Local-memory by default (per process, also used by the test runner). Set
+# CACHE_URL to redis://host:6379/0 or memcached://host:11211 to share the
+# default cache across workers.
+# The catalogue cache holds pre-encoded product lists keyed by the catalogue
+# version, which lives in the database (InventoryService.get_catalogue_version),
+# so it can stay per process (CATALOGUE_CACHE_URL unset) or be shared too.
+def cache_from_url(url, location):
+    if url.startswith(('redis://', 'rediss://')):
+        return {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': url}
+    if url.startswith('memcached://'):
+        return {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': url.removeprefix('memcached://'),
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': location,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+
+CACHES = {
+    'default': cache_from_url(os.environ.get('CACHE_URL', ''), 'bakeryhub'),
+    'catalogue': cache_from_url(os.environ.get('CATALOGUE_CACHE_URL', ''), 'bakeryhub-catalogue'),
+}
+
+# Seconds an encoded product list is kept (a Product write makes it unreachable sooner)
+CATALOGUE_CACHE_TTL = 3600
+
+# Seconds the factory dashboard payload is served from cache
+FACTORY_STATS_CACHE_TTL = 30
+
+# Seconds an authenticated user (with role) stays cached by CustomJWTAuthentication.
+# Off unless CACHE_URL is set: a role change only invalidates the cache of the
+# process that made it, so a per-process cache would keep stale roles elsewhere.
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 300 if os.environ.get('CACHE_URL') else 0))
+
+# Idempotency-Key records (core/idempotency.py): seconds a stored response can be
+# replayed, and seconds before an unfinished claim is assumed abandoned
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Write-behind stock ledger (core/ledger.py): checkout reserves units in the cache
+# and journals them instead of locking outlet_stock rows; run flush_stock_ledger
+# alongside the workers. Needs a shared CACHE_URL with more than one worker process.
+STOCK_LEDGER_ENABLED = os.environ.get('STOCK_LEDGER', '0') == '1'
+# Cache alias holding the availability counters
+STOCK_LEDGER_CACHE = 'default'
+# Seconds a cached availability counter lives before it is rebuilt from the database
+STOCK_LEDGER_TTL = 300
+# Seconds between flush_stock_ledger --loop batches
+STOCK_LEDGER_FLUSH_INTERVAL = 2
+
+# Till lookups (StockLookupService) slower than this many milliseconds are logged
+STOCK_SEARCH_BUDGET_MS = 5
+
+# Transactional outbox (core/outbox.py, run_outbox_worker): attempts before a message
+# is marked FAILED, and the retry backoff in seconds (doubling from the first delay)
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 5
+OUTBOX_MAX_RETRY_DELAY = 3600
+# Seconds a claimed message stays with its worker; if the worker dies it is
+# handed out again after this, so keep it above the slowest handler
+OUTBOX_LEASE = 300
+# Seconds an idle worker waits before polling again
+OUTBOX_POLL_INTERVAL = 1
+
+# Outgoing mail (outbox notifications): printed to the console unless configured
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'no-reply@bakeryhub.local')
+
+# Live events (core/events.py): in-process broker unless a Redis URL is given,
+# which fans events out across worker processes
+EVENT_BROKER_URL = os.environ.get('EVENT_BROKER_URL', '')
+# Events buffered per open stream before a slow client is told to resync
+EVENT_STREAM_QUEUE_SIZE = 256
+# Seconds between keepalive comments on an idle stream
+EVENT_STREAM_KEEPALIVE = 15
+
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Register model signal handlers (stats counters, caches)
+        from . import signals  # noqa: F401
+        # Register outbox handlers (run_outbox_worker)
+        from . import tasks  # noqa: F401
+        # Count queries per request on every connection, in any thread (RequestMetricsMiddleware)
+        from .metrics import install_query_timer
+        connection_created.connect(install_query_timer, dispatch_uid='core.metrics.install_query_timer')
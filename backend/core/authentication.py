@@ -1,23 +1,95 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from .models import User
 
+USER_CACHE_KEY = 'auth:user:{user_id}'
+
+
+def invalidate_cached_user(*user_ids):
+    """Drop cached users so the next request reloads them (role change, deactivation)."""
+    cache.delete_many([USER_CACHE_KEY.format(user_id=user_id) for user_id in user_ids])
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     """
-    Custom Authentication to handle 'user_id' instead of default 'id'
+    Custom Authentication to handle 'user_id' instead of default 'id'.
+
+    The user is cached together with its role (AUTH_USER_CACHE_TTL seconds),
+    so a warm request runs no queries for authentication or for the role
+    checks in core/permissions.py. core/signals.py invalidates the entry
+    whenever the User or its Role is saved or deleted. Misses read the primary,
+    even under ReplicaReadMixin, so a lagging replica cannot cache a stale role.
+
+    - Queryset .update() / bulk_update() on User or Role skip those signals:
+      call invalidate_cached_user() after them.
+    - Invalidation only reaches the cache of the process that made the change,
+      so caching is off (AUTH_USER_CACHE_TTL = 0) unless CACHE_URL points every
+      worker at one shared cache.
     """
 
+    @staticmethod
+    def users():
+        return User.objects.using(router.db_for_write(User)).select_related('role')
+
     def get_user(self, validated_token):
         try:
             # 1. Get the user_id from the token
             user_id = validated_token['user_id']
+        except KeyError:
+            raise AuthenticationFailed('Token is invalid', code='token_invalid')
 
-            # 2. Find the user in YOUR custom table
-            user = User.objects.get(user_id=user_id)
-            return user
+        # 2. Serve from cache, else find the user (and role) in YOUR custom table
+        cache_key = USER_CACHE_KEY.format(user_id=user_id)
+        ttl = settings.AUTH_USER_CACHE_TTL
+        user = cache.get(cache_key) if ttl else None
+        if user is None:
+            try:
+                user = self.users().get(user_id=user_id)
+            except User.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            if ttl:
+                cache.set(cache_key, user, ttl)
 
-        except User.DoesNotExist:
-            raise AuthenticationFailed('User not found', code='user_not_found')
+        # 3. Deactivated accounts lose access immediately
+        if user.is_active is False:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+
+    async def aget_user(self, validated_token):
+        """Async twin of get_user for the async views (same cache, async ORM)."""
+        try:
+            user_id = validated_token['user_id']
         except KeyError:
-            raise AuthenticationFailed('Token is invalid', code='token_invalid')
\ No newline at end of file
+            raise AuthenticationFailed('Token is invalid', code='token_invalid')
+
+        cache_key = USER_CACHE_KEY.format(user_id=user_id)
+        ttl = settings.AUTH_USER_CACHE_TTL
+        user = await cache.aget(cache_key) if ttl else None
+        if user is None:
+            try:
+                user = await self.users().aget(user_id=user_id)
+            except User.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            if ttl:
+                await cache.aset(cache_key, user, ttl)
+
+        if user.is_active is False:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for plain Django async views: token parsing and signature
+        checks are CPU only, the user lookup is awaited. Returns a user or None.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return await self.aget_user(self.get_validated_token(raw_token))
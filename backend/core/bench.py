@@ -0,0 +1,174 @@
+"""
+Small load driver shared by the benchmark commands.
+
+run_load() calls `request_fn(client)` from `clients` threads, each with its own
+client object, and reports throughput and latency percentiles. It has no
+dependencies beyond the standard library so it runs anywhere the app runs.
+
+run_load_async() is the asyncio counterpart: `clients` concurrent tasks on one
+event loop, for endpoints served through the ASGI handler.
+"""
+import asyncio
+import datetime
+import json
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def run_load(request_fn, make_client, clients=8, requests_per_client=100):
+    """
+    request_fn(client) performs one request and returns True on success.
+    make_client() builds one client per worker thread.
+    """
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    start_gate = threading.Barrier(clients)
+
+    def worker():
+        nonlocal errors
+        client = make_client()
+        local, failed = [], 0
+        start_gate.wait()
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                ok = request_fn(client)
+            except Exception:
+                ok = False
+            if ok:
+                local.append(time.perf_counter() - started)
+            else:
+                failed += 1
+        connections.close_all()  # each thread opened its own DB connection
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [pool.submit(worker) for _ in range(clients)]:
+            future.result()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_load_async(request_fn, make_client, clients=8, requests_per_client=100):
+    """Like run_load, but request_fn is a coroutine and clients are tasks on one loop."""
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        client = make_client()
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                ok = await request_fn(client)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+# ------------------------------------------
+# Clients: in-process (Django test Client) or real HTTP
+# ------------------------------------------
+class HttpClient:
+    """Minimal urllib client with the same get/post signature the scenarios use."""
+
+    def __init__(self, base_url, headers=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+
+    def request(self, method, path, data=None, headers=None):
+        body = json.dumps(data).encode() if data is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=body, method=method,
+            headers={'Content-Type': 'application/json', **self.headers, **(headers or {})},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class InProcessClient:
+    """Wraps django.test.Client so it matches HttpClient.request()."""
+
+    def __init__(self, headers=None):
+        self.client = Client()
+        self.headers = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (headers or {}).items()}
+
+    def request(self, method, path, data=None, headers=None):
+        extra = dict(self.headers)
+        extra.update({f"HTTP_{k.upper().replace('-', '_')}": v for k, v in (headers or {}).items()})
+        if method == 'GET':
+            response = self.client.get(path, **extra)
+        else:
+            response = self.client.generic(
+                method, path, json.dumps(data) if data is not None else '', content_type='application/json', **extra
+            )
+        return response.status_code, response.content
+
+
+def in_process():
+    """
+    Context manager for in-process runs: lets the test Client's 'testserver' host
+    through ALLOWED_HOSTS and lifts the login rate limits (every client shares one IP).
+    """
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], LOGIN_RATE_LIMITS={})
+
+
+def run_metadata(**extra):
+    """Describe the run so result files from different commits can be compared."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_commit': commit,
+        'database': connection.vendor,
+        **extra,
+    }
@@ -0,0 +1,51 @@
+"""
+Validators for conditional GET (ETag / Last-Modified).
+
+Used with django.views.decorators.http.condition on the read endpoints so an
+unchanged poll is answered with 304 Not Modified before any serializer runs.
+"""
+import datetime
+import hashlib
+
+from core.services import InventoryService
+
+
+def _etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+# --- Products ---
+def catalogue_version(request):
+    # Read once per request: the ETag, Last-Modified and the view itself all need it
+    if not hasattr(request, '_catalogue_version'):
+        request._catalogue_version = InventoryService.get_catalogue_version()
+    return request._catalogue_version
+
+
+def product_list_etag(request, *args, **kwargs):
+    return _etag('products', catalogue_version(request), request.META.get('QUERY_STRING', ''))
+
+
+def product_list_last_modified(request, *args, **kwargs):
+    version = catalogue_version(request)
+    return datetime.datetime.fromtimestamp(version / 1e9, tz=datetime.timezone.utc)
+
+
+# --- Outlet stock ---
+def _stock_validators(request, outlet_id):
+    # etag and last_modified are both asked for; run the aggregate once per request
+    if not hasattr(request, '_stock_validators'):
+        request._stock_validators = InventoryService.get_stock_validators(outlet_id)
+    return request._stock_validators
+
+
+def outlet_stock_etag(request, outlet_id, **kwargs):
+    # Rows carry product names and prices, so catalogue edits change the ETag too
+    last_modified, rows = _stock_validators(request, outlet_id)
+    return _etag('stock', outlet_id, last_modified, rows, catalogue_version(request),
+                 request.META.get('QUERY_STRING', ''))
+
+
+def outlet_stock_last_modified(request, outlet_id, **kwargs):
+    last_modified, _ = _stock_validators(request, outlet_id)
+    return max(filter(None, (last_modified, product_list_last_modified(request))), default=None)
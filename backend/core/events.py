@@ -0,0 +1,198 @@
+"""
+Live change feed for the dashboards (served as Server-Sent Events by core/views/events.py).
+
+Writers publish small events once their transaction commits (publish_on_commit);
+each open stream holds a Subscription on one or more channels:
+
+- outlet:<outlet_id>  stock quantity changes and customer order status for that outlet
+- factory             factory dashboard counters and activity entries
+
+Every event carries absolute values (new quantity, new status, new counter value),
+so a client may apply one twice or after reloading its snapshot without drifting.
+
+The in-process broker only reaches streams held by the same worker process. Set
+EVENT_BROKER_URL to a Redis-compatible URL to fan out across workers: events are
+then published to Redis and one listener thread per process feeds the local
+subscribers.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+try:
+    import redis
+except ImportError:  # optional: only needed for the Redis broker
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+FACTORY_CHANNEL = 'factory'
+
+# Sent to a subscriber that fell too far behind: reload the snapshot
+RESYNC = {'type': 'resync'}
+
+
+def outlet_channel(outlet_id):
+    return f'outlet:{outlet_id}'
+
+
+class Subscription:
+    """Bounded queue of events for one stream, fed from any thread."""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def offer(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:  # the stream's event loop is gone
+            self.broker.unsubscribe(self)
+
+    def _put(self, event):
+        if self.queue.full():
+            # Too slow to keep up: drop the backlog and have the client reload
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=256):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, *channels):
+        """Register a Subscription (call from the stream's event loop)."""
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+
+class RedisBroker(InProcessBroker):
+    """Publishes through Redis PUBLISH; a listener thread fans messages out to local subscribers."""
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, url, prefix='bakeryhub:events:', queue_size=256):
+        if redis is None:
+            raise ImproperlyConfigured("redis is required for EVENT_BROKER_URL (pip install redis)")
+        super().__init__(queue_size)
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._listener = None
+
+    def publish(self, channel, event):
+        # The change is already committed: a lost event only leaves streams stale until
+        # their next resync, so a broker outage must not fail the request that caused it
+        try:
+            self.client.publish(self.prefix + channel, json.dumps(event, cls=DjangoJSONEncoder))
+        except redis.RedisError:
+            logger.warning("Event for %s not published (broker unavailable)", channel, exc_info=True)
+
+    def subscribe(self, *channels):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='event-broker', daemon=True)
+                self._listener.start()
+        return super().subscribe(*channels)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for message in pubsub.listen():
+                    channel = message['channel'].decode()[len(self.prefix):]
+                    super().publish(channel, json.loads(message['data']))
+            except redis.RedisError:
+                # Events published while disconnected are lost; tell every stream to reload
+                with self._lock:
+                    channels = list(self._subscribers)
+                for channel in channels:
+                    super().publish(channel, RESYNC)
+                time.sleep(self.RECONNECT_DELAY)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = settings.EVENT_BROKER_URL
+                queue_size = settings.EVENT_STREAM_QUEUE_SIZE
+                _broker = RedisBroker(url, queue_size=queue_size) if url else InProcessBroker(queue_size)
+    return _broker
+
+
+def publish_on_commit(channel, event):
+    """
+    Publish once the surrounding transaction commits (immediately in autocommit).
+    robust=True: an error is logged rather than raised into the request, which has
+    already committed and must still get its response (and idempotency record).
+    """
+    transaction.on_commit(lambda: get_broker().publish(channel, event), robust=True)
+
+
+def stock_event(outlet_id, rows):
+    """rows: (stock_id, batch_id, current_quantity, last_updated) tuples for one outlet."""
+    return {
+        'type': 'stock',
+        'outlet_id': outlet_id,
+        'rows': [
+            {
+                'stock_id': stock_id,
+                'batch': batch_id,
+                'current_quantity': quantity,
+                'last_updated': last_updated.isoformat() if last_updated else None,
+            }
+            for stock_id, batch_id, quantity, last_updated in rows
+        ],
+    }
@@ -0,0 +1,153 @@
+"""
+Restock suggestion engine.
+
+Demand history for every (outlet, product) pair is loaded with ONE grouped
+query into a dense NumPy array shaped (outlets, products, days); the forecast
+and the order quantities are then computed for all pairs at once.
+"""
+import datetime
+import time
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import JobCheckpoint, OutletStock, RestockRequest, RestockStatus, SaleItem, SaleStatus
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the restock engine needs it
+    np = None
+
+
+class RestockEngine:
+    """
+    method='ewma': exponentially weighted average of daily demand (weight decays by 1 - alpha per day back).
+    method='sma':  plain moving average over the history window.
+
+    Suggested quantity = ceil(forecast * cover_days) + minimum_stock_level - on-hand stock.
+    """
+    job_name = 'restock_engine'  # sentinel JobCheckpoint row that serializes run()
+
+    def __init__(self, history_days=28, method='ewma', alpha=0.3, cover_days=2, as_of=None):
+        if np is None:
+            raise ImproperlyConfigured("numpy is required for the restock engine (pip install numpy)")
+        if method not in ('ewma', 'sma'):
+            raise ValueError("method must be 'ewma' or 'sma'")
+        if history_days <= 0:
+            raise ValueError("history_days must be positive")
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        if cover_days < 1:
+            raise ValueError("cover_days must be at least 1")
+        self.history_days = history_days
+        self.method = method
+        self.alpha = alpha
+        self.cover_days = cover_days
+        self.as_of = as_of or timezone.localdate()
+
+    def load_demand(self):
+        """
+        One query: units sold per (outlet, product, day) over the history window.
+        Returns ([(outlet_id, product_id, day, units), ...], first day of the window).
+        """
+        start = self.as_of - datetime.timedelta(days=self.history_days)
+        # Compare raw datetimes (not __date) so the sale_date index stays usable
+        window = [
+            timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+            for day in (start, self.as_of)
+        ]
+        rows = list(
+            SaleItem.objects.filter(
+                sale__status=SaleStatus.COMPLETED,
+                sale__sale_date__gte=window[0],
+                sale__sale_date__lt=window[1],
+            )
+            .annotate(day=TruncDate('sale__sale_date'))
+            .values_list('sale__outlet_id', 'batch__product_id', 'day')
+            .annotate(units=Sum('quantity'))
+            .order_by()
+        )
+        return rows, start
+
+    def load_stock(self):
+        """One query: sellable units and minimum level per (outlet, product)."""
+        return list(
+            OutletStock.objects.filter(batch__expiry_date__gte=self.as_of)
+            .values_list('outlet_id', 'batch__product_id')
+            .annotate(on_hand=Sum('current_quantity'), min_level=Max('minimum_stock_level'))
+            .order_by()
+        )
+
+    def weights(self):
+        if self.method == 'sma':
+            w = np.ones(self.history_days)
+        else:
+            # Oldest day first, so the most recent day gets weight 1
+            w = (1 - self.alpha) ** np.arange(self.history_days - 1, -1, -1)
+        return w / w.sum()
+
+    def compute(self):
+        """
+        Returns a list of unsaved RestockRequest objects, one per pair that needs stock.
+        """
+        sales, start = self.load_demand()
+        stock = self.load_stock()
+
+        outlet_ids = sorted({row[0] for row in sales} | {row[0] for row in stock})
+        product_ids = sorted({row[1] for row in sales} | {row[1] for row in stock})
+        if not outlet_ids or not product_ids:
+            return []
+        o_index = {outlet_id: i for i, outlet_id in enumerate(outlet_ids)}
+        p_index = {product_id: i for i, product_id in enumerate(product_ids)}
+        shape = (len(outlet_ids), len(product_ids))
+
+        demand = np.zeros(shape + (self.history_days,))
+        if sales:
+            o, p, day, units = zip(*sales)
+            d = np.array([(value - start).days for value in day])
+            np.add.at(demand, (np.array([o_index[x] for x in o]), np.array([p_index[x] for x in p]), d), units)
+
+        on_hand = np.zeros(shape, dtype=np.int64)
+        min_level = np.zeros(shape, dtype=np.int64)
+        if stock:
+            o, p, qty, level = zip(*stock)
+            idx = (np.array([o_index[x] for x in o]), np.array([p_index[x] for x in p]))
+            on_hand[idx] = qty
+            min_level[idx] = [value or 0 for value in level]
+
+        forecast = demand @ self.weights()
+        needed = np.ceil(forecast * self.cover_days).astype(np.int64) + min_level - on_hand
+
+        now = timezone.now()
+        return [
+            RestockRequest(
+                outlet_id=outlet_ids[i],
+                product_id=product_ids[j],
+                requested_quantity=int(needed[i, j]),
+                forecast_daily_demand=Decimal(f"{forecast[i, j]:.2f}"),
+                current_stock=int(on_hand[i, j]),
+                created_at=now,
+            )
+            for i, j in zip(*np.nonzero(needed > 0))
+        ]
+
+    @transaction.atomic
+    def run(self):
+        """
+        Replace the still-unsent (GENERATED) suggestions with a fresh set, in bulk.
+        Runs one at a time (the command and every outbox worker may start one): the
+        sentinel JobCheckpoint row is locked first, so a second run waits, then
+        computes from what the first one committed instead of adding a duplicate set.
+        Returns (requests created, seconds taken).
+        """
+        started = time.monotonic()
+        JobCheckpoint.objects.get_or_create(job_name=self.job_name)
+        JobCheckpoint.objects.select_for_update().get(job_name=self.job_name)
+        requests = self.compute()
+        RestockRequest.objects.filter(status=RestockStatus.GENERATED).delete()
+        RestockRequest.objects.bulk_create(requests, batch_size=5000)
+        return len(requests), time.monotonic() - started
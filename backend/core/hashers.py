@@ -0,0 +1,19 @@
+"""
+Password hashers with a work factor taken from settings.
+
+PASSWORD_HASH_ITERATIONS sets the PBKDF2 cost, so CPU per login can be tuned
+per deployment (see the bench_login command). Changing it makes Django's
+check_password report the stored hash as outdated, and AuthService rehashes
+it on the user's next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Same algorithm name as Django's hasher, so hashes stay interchangeable
+    algorithm = 'pbkdf2_sha256'
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,149 @@
+"""
+Idempotency-Key support for write endpoints.
+
+A client that may retry a write sends `Idempotency-Key: <unique value>`. The
+first request claims the key (a SELECT and an INSERT), runs the view and
+stores the response (one UPDATE). A retry with the same key and the same
+request is answered from the stored response with one SELECT: the view does
+not run again and nothing is written.
+
+Views add 5 to their query_budget for a key: the INSERT runs in its own atomic
+block, which adds a SAVEPOINT and RELEASE inside a transaction (a BEGIN on
+SQLite, no statement on PostgreSQL).
+
+- same key, different method/path/body      -> 422
+- same key while the first one still runs   -> 409 with Retry-After
+- the first request failed with a 5xx/crash -> key released, a retry runs the view
+- a claim left by a crashed worker is taken over after IDEMPOTENCY_LOCK_TIMEOUT
+
+Keys are scoped per user and expire after IDEMPOTENCY_KEY_TTL seconds
+(purge_idempotency_keys deletes old records).
+"""
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import IdempotencyRecord
+
+
+class IdempotentReplay(Exception):
+    """Raised from initial() to answer the request without running the handler."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class IdempotencyMixin:
+    """Add before APIView: class BatchCreateView(IdempotencyMixin, APIView)."""
+    idempotency_header = 'Idempotency-Key'
+    idempotent_methods = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._idempotency_record = None
+        key = request.headers.get(self.idempotency_header)
+        if not key or request.method not in self.idempotent_methods or not request.user.is_authenticated:
+            return
+        if len(key) > 255:
+            raise IdempotentReplay(Response(
+                {"error": f"{self.idempotency_header} must be at most 255 characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            ))
+        self._idempotency_record = self.claim_idempotency_key(request, key)
+
+    def claim_idempotency_key(self, request, key):
+        """Return the new record this request owns, or raise IdempotentReplay."""
+        fingerprint = self.request_fingerprint(request)
+        now = timezone.now()
+        # A retry costs this one SELECT
+        record = IdempotencyRecord.objects.filter(user_id=request.user.user_id, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    return IdempotencyRecord.objects.create(
+                        user_id=request.user.user_id, key=key, fingerprint=fingerprint, created_at=now
+                    )
+            except IntegrityError:
+                # A concurrent request with the same key claimed it first
+                raise IdempotentReplay(self.in_progress_response())
+
+        expired = record.created_at < now - datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        abandoned = (
+            record.status_code is None
+            and record.created_at < now - datetime.timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+        )
+        if expired or abandoned:
+            # Take the key over; the conditional UPDATE lets only one retry win
+            taken = IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).update(
+                fingerprint=fingerprint, status_code=None, content_type='', response_body=b'', created_at=now
+            )
+            if taken:
+                record.fingerprint, record.status_code, record.created_at = fingerprint, None, now
+                return record
+            raise IdempotentReplay(self.in_progress_response())
+
+        if record.fingerprint != fingerprint:
+            raise IdempotentReplay(Response(
+                {"error": f"{self.idempotency_header} was already used for a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            ))
+        if record.status_code is None:
+            raise IdempotentReplay(self.in_progress_response())
+
+        response = HttpResponse(bytes(record.response_body), status=record.status_code,
+                                content_type=record.content_type or None)
+        response['Idempotent-Replayed'] = 'true'
+        raise IdempotentReplay(response)
+
+    @staticmethod
+    def request_fingerprint(request):
+        digest = hashlib.sha256(f"{request.method}\n{request.get_full_path()}\n".encode())
+        digest.update(request.body)
+        return digest.hexdigest()
+
+    def in_progress_response(self):
+        return Response(
+            {"error": f"A request with this {self.idempotency_header} is still in progress"},
+            status=status.HTTP_409_CONFLICT,
+            headers={'Retry-After': '1'},
+        )
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotentReplay):
+            return exc.response
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            self.release_idempotency_key()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        record = getattr(self, '_idempotency_record', None)
+        if record is None:
+            return response
+        self._idempotency_record = None
+
+        if response.status_code >= 500 or response.streaming:
+            record.delete()  # not replayable: let the retry run the view
+            return response
+        if hasattr(response, 'render'):
+            response.render()
+        IdempotencyRecord.objects.filter(pk=record.pk).update(
+            status_code=response.status_code,
+            content_type=response.get('Content-Type', ''),
+            response_body=response.content,
+        )
+        return response
+
+    def release_idempotency_key(self):
+        record = getattr(self, '_idempotency_record', None)
+        if record is not None:
+            self._idempotency_record = None
+            record.delete()
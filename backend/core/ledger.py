@@ -0,0 +1,202 @@
+"""
+Write-behind stock ledger (optional, STOCK_LEDGER_ENABLED).
+
+Without it every checkout updates its outlet_stock rows under row locks, so
+tills selling the same hot batches queue behind each other. With it:
+
+- availability per stock row is held in the STOCK_LEDGER_CACHE cache and
+  checkout reserves units with atomic decrements instead of row locks;
+- each sale appends its decrements to stock_journal inside the sale's
+  transaction, so a committed sale is never lost;
+- flush_stock_ledger folds pending entries into outlet_stock in batches
+  (one UPDATE per batch) and deletes them in the same transaction;
+- stock reads add the pending deltas to current_quantity.
+
+The cache only gates overselling. A missing key is rebuilt from
+current_quantity plus the pending journal (a replay, see seed()), so losing the
+cache or a worker loses nothing. With several worker processes the cache must
+be shared (CACHE_URL), otherwise each process gates on its own copy.
+
+Keys expire after STOCK_LEDGER_TTL seconds to bound drift from writes the
+ledger cannot see. The known one: checkout called inside an outer transaction
+that later rolls back. Its journal entries vanish but its reservation stays
+taken, so those units read as sold (never oversold) until the key expires or
+is forgotten.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.models import OutletStock, StockJournalEntry
+
+logger = logging.getLogger(__name__)
+
+
+class StockLedger:
+    KEY = 'stock_ledger:{stock_id}'
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'STOCK_LEDGER_ENABLED', False)
+
+    @staticmethod
+    def cache():
+        return caches[getattr(settings, 'STOCK_LEDGER_CACHE', 'default')]
+
+    @staticmethod
+    def key(stock_id):
+        return StockLedger.KEY.format(stock_id=stock_id)
+
+    @staticmethod
+    def available_expression():
+        """current_quantity plus the row's pending journal deltas, to annotate OutletStock querysets."""
+        pending = (
+            StockJournalEntry.objects.filter(stock_id=OuterRef('stock_id'))
+            .values('stock_id').annotate(total=Sum('delta')).values('total')
+        )
+        return F('current_quantity') + Coalesce(Subquery(pending), 0)
+
+    @staticmethod
+    def available(stocks):
+        """{stock_id: units available} for OutletStock rows; rows missing from the cache are seeded first."""
+        keys = {stock.stock_id: StockLedger.key(stock.stock_id) for stock in stocks}
+        cached = StockLedger.cache().get_many(list(keys.values()))
+        available = {stock_id: cached[key] for stock_id, key in keys.items() if key in cached}
+        missing = [stock_id for stock_id in keys if stock_id not in available]
+        if missing:
+            available.update(StockLedger.seed(missing))
+        return available
+
+    @staticmethod
+    def seed(stock_ids):
+        """
+        Rebuild the cached availability of `stock_ids`; call inside a transaction.
+
+        A sale journals its rows before it reserves them (SalesService.checkout), and
+        each journal insert holds a key-share lock on its stock row until the sale
+        commits or rolls back. Locking the rows FOR UPDATE therefore waits for every
+        sale that may have reserved against an expired key, and the read after it
+        (a new statement, so a new snapshot) includes their entries. Rows are locked
+        in stock_id order, the order record() journals them in.
+        """
+        list(
+            OutletStock.objects.select_for_update().filter(stock_id__in=stock_ids)
+            .order_by('stock_id').values_list('stock_id', flat=True)
+        )
+        rows = (
+            OutletStock.objects.filter(stock_id__in=stock_ids)
+            .annotate(available_quantity=StockLedger.available_expression())
+            .values_list('stock_id', 'available_quantity')
+        )
+        cache = StockLedger.cache()
+        seeded = {}
+        for stock_id, quantity in rows:
+            key = StockLedger.key(stock_id)
+            # add(): a concurrent seed (and any decrement on it) wins
+            if cache.add(key, quantity, timeout=settings.STOCK_LEDGER_TTL):
+                seeded[stock_id] = quantity
+            else:
+                seeded[stock_id] = cache.get(key, quantity)
+        return seeded
+
+    @staticmethod
+    def reserve(quantities):
+        """
+        Take {stock_id: units} out of the ledger with atomic decrements.
+        Returns {stock_id: units left}, or None with nothing taken if a row
+        would go negative or its key expired since it was read.
+        """
+        cache = StockLedger.cache()
+        taken, left = {}, {}
+        for stock_id, qty in quantities.items():
+            try:
+                value = cache.decr(StockLedger.key(stock_id), qty)
+            except ValueError:
+                value = None
+            else:
+                taken[stock_id] = qty
+            if value is None or value < 0:
+                StockLedger.release(taken)
+                return None
+            left[stock_id] = value
+        return left
+
+    @staticmethod
+    def release(quantities):
+        """Give back units taken by reserve() for a sale that was not written."""
+        cache = StockLedger.cache()
+        for stock_id, qty in quantities.items():
+            try:
+                cache.incr(StockLedger.key(stock_id), qty)
+            except ValueError:
+                pass  # expired: rebuilt from the database on the next read
+
+    @staticmethod
+    def record(outlet_id, sale, allocations, now):
+        """
+        Append the sale's decrements to the journal; allocations are (stock, quantity) pairs.
+        Call before reserve(): see seed() for why, and for the stock_id order.
+        """
+        StockJournalEntry.objects.bulk_create([
+            StockJournalEntry(outlet_id=outlet_id, stock_id=stock.stock_id, sale=sale, delta=-qty, created_at=now)
+            for stock, qty in sorted(allocations, key=lambda allocation: allocation[0].stock_id)
+        ])
+
+    @staticmethod
+    def forget(stock_ids):
+        """Drop cached availability after a direct write to outlet_stock (restock, edits)."""
+        StockLedger.cache().delete_many([StockLedger.key(stock_id) for stock_id in stock_ids])
+
+    @staticmethod
+    @transaction.atomic
+    def flush(limit=5000):
+        """
+        Business Logic:
+        1. Lock the oldest `limit` pending entries (skipping any a concurrent flush holds).
+        2. Sum them per stock row, lock those rows (stock_id order) and apply the sums
+           with ONE conditional UPDATE. A row is never taken below 0 (the
+           outlet_stock_quantity_non_negative constraint): an oversold row, which
+           only a cache that lost decrements can cause, is clamped, logged and its
+           cached availability dropped so it is rebuilt from the database.
+        3. Delete the applied entries in the same transaction, so a read sees each
+           delta exactly once. Available quantities do not change, so the cache stays valid.
+        Returns the number of entries applied.
+        """
+        entries = list(
+            StockJournalEntry.objects.select_for_update(skip_locked=True)
+            .order_by('entry_id').values_list('entry_id', 'stock_id', 'delta')[:limit]
+        )
+        if not entries:
+            return 0
+        deltas = defaultdict(int)
+        for _, stock_id, delta in entries:
+            deltas[stock_id] += delta
+
+        current = dict(
+            OutletStock.objects.select_for_update().filter(stock_id__in=deltas)
+            .order_by('stock_id').values_list('stock_id', 'current_quantity')
+        )
+        oversold = {
+            stock_id: -(current[stock_id] + delta)
+            for stock_id, delta in deltas.items() if stock_id in current and current[stock_id] + delta < 0
+        }
+        if oversold:
+            logger.error("Stock ledger oversold %s (stock_id: units); clamped at 0", oversold)
+            transaction.on_commit(lambda: StockLedger.forget(oversold))
+
+        OutletStock.objects.filter(stock_id__in=deltas).update(
+            current_quantity=Case(
+                *(When(stock_id=stock_id, then=Greatest(F('current_quantity') + delta, Value(0)))
+                  for stock_id, delta in deltas.items()),
+                output_field=IntegerField(),
+            ),
+            last_updated=timezone.now(),
+        )
+        StockJournalEntry.objects.filter(entry_id__in=[entry[0] for entry in entries]).delete()
+        return len(entries)
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import AsyncClient
+
+from core import bench
+from core.models import OutletStock, User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync (WSGI handler, one thread per client) and async (ASGI handler, "
+        "one task per client) read endpoints in-process at high concurrency."
+    )
+    endpoints = {
+        'products': ('/api/products', '/api/async/products'),
+        'stock': ('/api/stock/{outlet}/', '/api/async/stock/{outlet}/'),
+        'factory_stats': ('/api/factory/stats', '/api/async/factory/stats'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=50, help="Requests per client.")
+        parser.add_argument('--username', default='bench_admin')
+        parser.add_argument('--output', '-o', help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"User {options['username']} not found; run seed_bakery_data first")
+        outlet_id = (
+            OutletStock.objects.values('outlet_id').annotate(n=Count('stock_id')).order_by('-n')
+            .values_list('outlet_id', flat=True).first()
+        )
+        token = str(RefreshToken.for_user(user).access_token)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        results = {}
+        with bench.in_process():
+            for name, (sync_path, async_path) in self.endpoints.items():
+                sync_path, async_path = sync_path.format(outlet=outlet_id), async_path.format(outlet=outlet_id)
+                results[name] = {
+                    'wsgi': bench.run_load(
+                        lambda client: client.request('GET', sync_path)[0] == 200,
+                        lambda: bench.InProcessClient(headers),
+                        options['clients'], options['requests'],
+                    ),
+                    'asgi': asyncio.run(bench.run_load_async(
+                        self.async_get(async_path, headers),
+                        AsyncClient,
+                        options['clients'], options['requests'],
+                    )),
+                }
+
+        for name, modes in results.items():
+            for mode, stats in modes.items():
+                self.stdout.write(
+                    f"{name:<14} {mode:<5} {stats['throughput_rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f} ms  "
+                    f"p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}"
+                )
+        if options['output']:
+            report = {
+                'meta': bench.run_metadata(clients=options['clients'], requests_per_client=options['requests']),
+                'endpoints': results,
+            }
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    @staticmethod
+    def async_get(path, headers):
+        # Headers go per request: AsyncClient(headers=...) mangles them on some Django versions
+        async def request(client):
+            response = await client.get(path, headers=headers)
+            return response.status_code == 200
+        return request
@@ -0,0 +1,89 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+from django.db.models import Count
+
+from core import bench
+from core.models import OutletStock, User
+from rest_framework_simplejwt.tokens import RefreshToken
+
+try:
+    import psycopg_pool
+except ImportError:  # optional: the pool mode is skipped without it
+    psycopg_pool = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests per second on the outlet stock endpoint with new connections per request, "
+        "persistent connections (CONN_MAX_AGE) and the psycopg pool (PostgreSQL only). "
+        "Runs in-process and closes/returns connections after every request like the real "
+        "request handler does."
+    )
+    modes = {
+        'no_reuse': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+        'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+        'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per client per mode.")
+        parser.add_argument('--username', default='bench_admin')
+        parser.add_argument('--output', '-o', help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"User {options['username']} not found; run seed_bakery_data first")
+        outlet_id = (
+            OutletStock.objects.values('outlet_id').annotate(n=Count('stock_id')).order_by('-n')
+            .values_list('outlet_id', flat=True).first()
+        )
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        path = f'/api/stock/{outlet_id}/'
+
+        def request_fn(client):
+            ok = client.request('GET', path)[0] == 200
+            close_old_connections()  # what request_finished does after each real request
+            return ok
+
+        # Worker threads build their connections from this shared settings dict
+        db_settings = connections.settings['default']
+        original = {key: db_settings.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+        results = {}
+        try:
+            with bench.in_process():
+                for mode, overrides in self.modes.items():
+                    options_dict = {k: v for k, v in (original['OPTIONS'] or {}).items() if k != 'pool'}
+                    if mode == 'pool':
+                        if connection.vendor != 'postgresql' or psycopg_pool is None:
+                            self.stdout.write(self.style.WARNING("pool: skipped (needs PostgreSQL and psycopg[pool])"))
+                            continue
+                        options_dict['pool'] = {'min_size': options['clients'], 'max_size': options['clients']}
+                    db_settings.update(overrides, OPTIONS=options_dict)
+                    connections.close_all()
+
+                    results[mode] = bench.run_load(
+                        request_fn, lambda: bench.InProcessClient(headers), options['clients'], options['requests']
+                    )
+                    if mode == 'pool':
+                        connection.close_pool()
+        finally:
+            db_settings.update(original)
+            connections.close_all()
+
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"{mode:<11} {stats['throughput_rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f} ms  "
+                f"p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}"
+            )
+        if options['output']:
+            report = {
+                'meta': bench.run_metadata(clients=options['clients'], requests_per_client=options['requests']),
+                'modes': results,
+            }
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
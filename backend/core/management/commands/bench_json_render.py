@@ -0,0 +1,101 @@
+import datetime
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core import bench
+from core.models import Product
+from core.renderers import FastJSONRenderer, orjson
+from core.serializers import ProductSerializer
+from core.services import InventoryService
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark the list endpoint encoders on synthetic rows (no database): "
+        "ModelSerializer + JSONRenderer vs value tuples + JSONRenderer vs value tuples + FastJSONRenderer. "
+        "Every variant must produce identical bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=7)
+        parser.add_argument('--output', '-o', help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        product_tuples = [
+            (n, f"Item {n} – crème brûlée" if n % 7 == 0 else f"Item {n}", None if n % 3 else "Fresh daily",
+             'Cakes' if n % 2 else 'Buns', Decimal(f"{n % 500}.{n % 100:02d}"), 2, 'PCS', True)
+            for n in range(rows)
+        ]
+        products = [Product(**dict(zip(InventoryService.PRODUCT_FIELDS, row))) for row in product_tuples]
+        today = datetime.date.today()
+        stock_tuples = [
+            (today + datetime.timedelta(days=n % 5), n, n % 40, n, f"Item {n}", f"B-{n}", Decimal(f"{n % 500}.50"))
+            for n in range(rows)
+        ]
+        names = list(InventoryService.STOCK_FIELDS)
+
+        def product_dicts():
+            return [
+                {name: str(value) if isinstance(value, Decimal) else value
+                 for name, value in zip(InventoryService.PRODUCT_FIELDS, row)}
+                for row in product_tuples
+            ]
+
+        def stock_payload():
+            page, _ = InventoryService.format_stock_page(stock_tuples, names, rows)
+            return {'next': None, 'results': page}
+
+        scenarios = {
+            'products': {
+                'serializer+drf_json': lambda: JSONRenderer().render(ProductSerializer(products, many=True).data),
+                'tuples+drf_json': lambda: JSONRenderer().render(product_dicts()),
+                'tuples+fast_json': lambda: FastJSONRenderer().render(product_dicts()),
+            },
+            'stock': {
+                'tuples+drf_json': lambda: JSONRenderer().render(stock_payload()),
+                'tuples+fast_json': lambda: FastJSONRenderer().render(stock_payload()),
+            },
+        }
+
+        results = {}
+        for scenario, variants in scenarios.items():
+            outputs = {name: fn() for name, fn in variants.items()}
+            if len(set(outputs.values())) != 1:
+                raise CommandError(f"{scenario}: variants produced different bytes")
+
+            baseline = None
+            results[scenario] = {}
+            for name, fn in variants.items():
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    fn()
+                    timings.append(time.perf_counter() - started)
+                per_10k = statistics.median(timings) * 1000 * 10000 / rows
+                baseline = baseline or per_10k
+                results[scenario][name] = {
+                    'median_ms_per_10k_rows': round(per_10k, 2),
+                    'best_ms_per_10k_rows': round(min(timings) * 1000 * 10000 / rows, 2),
+                    'speedup': round(baseline / per_10k, 2),
+                }
+                self.stdout.write(
+                    f"{scenario:<9} {name:<20} {per_10k:>9.2f} ms / 10k rows  x{baseline / per_10k:.2f}"
+                )
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: fast_json used the stdlib fallback"))
+        if options['output']:
+            report = {
+                'meta': bench.run_metadata(rows=rows, repeat=repeat, orjson=getattr(orjson, '__version__', None)),
+                'scenarios': results,
+            }
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,85 @@
+import json
+import logging
+import time
+
+from django.contrib.auth.hashers import check_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core import bench
+from core.models import User
+from core.services import AuthService
+
+
+class Command(BaseCommand):
+    help = (
+        "Logins per second per core (one thread) for several PASSWORD_HASH_ITERATIONS values: "
+        "the bare hash check and the full /api/auth/login request, plus how fast the rate "
+        "limiter rejects a storm. Uses a throwaway user inside a rolled back transaction."
+    )
+    password = 'bench-login-pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', default='100000,300000,600000,1000000',
+                            help="Comma separated PBKDF2 work factors to compare.")
+        parser.add_argument('--logins', type=int, default=20, help="Logins timed per work factor.")
+        parser.add_argument('--output', '-o', help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        work_factors = [int(value) for value in options['iterations'].split(',') if value.strip()]
+        logins = options['logins']
+        credentials = {'username': 'bench_login_tmp', 'password': self.password}
+
+        results = {'work_factors': {}}
+        with bench.in_process(), transaction.atomic():
+            user = User.objects.create(username=credentials['username'], password_hash='')
+            client = bench.InProcessClient()
+            for iterations in work_factors:
+                with override_settings(PASSWORD_HASH_ITERATIONS=iterations):
+                    encoded = AuthService.hash_password(self.password)
+                    User.objects.filter(pk=user.pk).update(password_hash=encoded)
+
+                    started = time.perf_counter()
+                    for _ in range(logins):
+                        check_password(self.password, encoded)
+                    hash_rate = logins / (time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    ok = sum(client.request('POST', '/api/auth/login', credentials)[0] == 200 for _ in range(logins))
+                    login_rate = logins / (time.perf_counter() - started)
+
+                results['work_factors'][iterations] = {
+                    'hash_checks_per_s': round(hash_rate, 1),
+                    'logins_per_s': round(login_rate, 1),
+                    'ms_per_login': round(1000 / login_rate, 2),
+                    'errors': logins - ok,
+                }
+                self.stdout.write(
+                    f"{iterations:>9,} iterations  {hash_rate:>8.1f} hash checks/s  {login_rate:>8.1f} logins/s  "
+                    f"{1000 / login_rate:>7.2f} ms/login  errors {logins - ok}"
+                )
+
+            # Storm against one IP: after the first attempt everything is rejected before hashing
+            rejected_total = logins * 20
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.ERROR)  # one "Too Many Requests" warning per request otherwise
+            with override_settings(LOGIN_RATE_LIMITS={'ip': (1, 60)}):
+                client.request('POST', '/api/auth/login', credentials)
+                started = time.perf_counter()
+                rejected = sum(
+                    client.request('POST', '/api/auth/login', credentials)[0] == 429 for _ in range(rejected_total)
+                )
+                reject_rate = rejected_total / (time.perf_counter() - started)
+            request_logger.setLevel(level)
+            results['rate_limited'] = {'rejected_per_s': round(reject_rate, 1), 'rejected': rejected}
+            self.stdout.write(f"rate limited storm: {reject_rate:>8.1f} rejections/s ({rejected}/{rejected_total} got 429)")
+
+            transaction.set_rollback(True)
+
+        if options['output']:
+            report = {'meta': bench.run_metadata(logins=logins), **results}
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,42 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import reports
+
+
+class Command(BaseCommand):
+    help = "Export sale lines for a date range as CSV or Parquet, streamed to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="First day (YYYY-MM-DD). Default: today.")
+        parser.add_argument('--to', dest='date_to', help="Last day, inclusive (YYYY-MM-DD). Default: --from.")
+        parser.add_argument('--outlet', type=int, help="Only this outlet_id.")
+        parser.add_argument('--format', choices=list(reports.EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', default='-', help="File path, or '-' for stdout (CSV only).")
+
+    def handle(self, *args, **options):
+        try:
+            date_from = datetime.date.fromisoformat(options['date_from']) if options['date_from'] else timezone.localdate()
+            date_to = datetime.date.fromisoformat(options['date_to']) if options['date_to'] else date_from
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD")
+
+        fmt = options['format']
+        if fmt == 'parquet' and reports.pa is None:
+            raise CommandError("pyarrow is required for Parquet exports")
+        if fmt == 'parquet' and options['output'] == '-':
+            raise CommandError("Parquet output needs --output")
+
+        chunks = reports.export_sales(fmt, date_from, date_to, options['outlet'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+
+        with open(options['output'], 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
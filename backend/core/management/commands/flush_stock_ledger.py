@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.ledger import StockLedger
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply pending stock ledger sales (stock_journal) to outlet_stock in batches. "
+        "Run once to replay the journal (e.g. after a crash or before turning STOCK_LEDGER off), "
+        "or with --loop next to the workers while the ledger is on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep flushing every STOCK_LEDGER_FLUSH_INTERVAL seconds.")
+
+    def handle(self, *args, **options):
+        total = self.drain(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Applied {total} pending journal entries"))
+        if not options['loop']:
+            return
+
+        try:
+            while True:
+                time.sleep(settings.STOCK_LEDGER_FLUSH_INTERVAL)
+                close_old_connections()
+                applied = self.drain(options['batch_size'])
+                if applied:
+                    self.stdout.write(f"  applied {applied} entries")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped; run once more to apply anything left")
+
+    @staticmethod
+    def drain(batch_size):
+        total = 0
+        while True:
+            applied = StockLedger.flush(limit=batch_size)
+            total += applied
+            if applied < batch_size:
+                return total
@@ -0,0 +1,66 @@
+import itertools
+import json
+import sys
+import time
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from core.services import BatchImportService
+
+
+class Command(BaseCommand):
+    help = "Bulk import factory batches from a CSV (with header), JSON array or NDJSON file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=BatchImportService.FORMATS,
+                            help="Defaults to the file extension, or ndjson for stdin.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (path.rsplit('.', 1)[-1].lower() if path != '-' else 'ndjson')
+        if fmt not in BatchImportService.FORMATS:
+            raise CommandError(f"Cannot infer format from {path}; pass --format")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            rows = self.read_rows(stream, fmt)
+            created = failed = 0
+            started = time.monotonic()
+            row_no = 1
+            # CSV and NDJSON are streamed; each chunk is validated and inserted on its own
+            while chunk := list(itertools.islice(rows, options['chunk_size'])):
+                try:
+                    count, errors = BatchImportService.import_rows(chunk, first_row=row_no)
+                except IntegrityError as e:
+                    raise CommandError(
+                        f"Rows {row_no}-{row_no + len(chunk) - 1} conflict with a concurrent import "
+                        f"and were not saved ({created} batches imported before them): {e}"
+                    )
+                created += count
+                failed += len(errors)
+                row_no += len(chunk)
+                for error in errors:
+                    self.stderr.write(f"row {error['row']}: {error['errors']}")
+        except (ValueError, csv.Error) as e:
+            raise CommandError(f"Could not parse {path}: {e}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.monotonic() - started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created} batches, {failed} rejected, in {elapsed:.2f}s ({rate:,.0f} batches/s)"
+        ))
+
+    @staticmethod
+    def read_rows(stream, fmt):
+        if fmt == 'csv':
+            return iter(csv.DictReader(stream))
+        if fmt == 'ndjson':
+            return (json.loads(line) for line in stream if line.strip())
+        return iter(BatchImportService.parse(stream.read(), 'json'))
@@ -0,0 +1,25 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than IDEMPOTENCY_KEY_TTL, in chunks. Run it from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        expired = IdempotencyRecord.objects.filter(created_at__lt=cutoff).order_by('created_at')
+        total = 0
+        while True:
+            ids = list(expired.values_list('record_id', flat=True)[:options['chunk_size']])
+            if not ids:
+                break
+            total += IdempotencyRecord.objects.filter(record_id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} idempotency records older than {cutoff:%Y-%m-%d %H:%M}"))
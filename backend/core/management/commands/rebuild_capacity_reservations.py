@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services import OrderSchedulingService
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-day capacity reservations from the customer orders, e.g. after "
+        "orders were imported or edited with bulk updates that skip signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat,
+                            help="First pickup date to rebuild (YYYY-MM-DD, default today).")
+
+    def handle(self, *args, **options):
+        date_from = options['date_from'] or timezone.localdate()
+        count = OrderSchedulingService.rebuild_reservations(date_from)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} reservations from {date_from}"))
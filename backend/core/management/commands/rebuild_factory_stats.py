@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.services import FactoryStatsService
+
+
+class Command(BaseCommand):
+    help = "Recompute factory dashboard counters from the batches and customer_orders tables."
+
+    def handle(self, *args, **options):
+        counters = FactoryStatsService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(counters)} counters"))
@@ -0,0 +1,51 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import Sale
+from core.services import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill or repair the daily_sales_rollup table from raw sales, a few days per transaction. "
+        "Safe while tills are selling: a chunk reaching yesterday or today holds checkouts' rollup "
+        "updates until it commits (see SalesRollupService.rebuild), so keep --chunk-days small there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="First day (YYYY-MM-DD). Default: first sale.")
+        parser.add_argument('--to', dest='date_to', help="Last day, inclusive (YYYY-MM-DD). Default: today.")
+        parser.add_argument('--chunk-days', type=int, default=7)
+
+    def handle(self, *args, **options):
+        try:
+            date_to = datetime.date.fromisoformat(options['date_to']) if options['date_to'] else timezone.localdate()
+            if options['date_from']:
+                date_from = datetime.date.fromisoformat(options['date_from'])
+            else:
+                first_sale = Sale.objects.aggregate(first=Min('sale_date'))['first']
+                if first_sale is None:
+                    self.stdout.write("No sales to roll up")
+                    return
+                date_from = timezone.localtime(first_sale).date()
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM-DD")
+
+        started = time.monotonic()
+        total = 0
+        chunk_start = date_from
+        step = datetime.timedelta(days=options['chunk_days'])
+        while chunk_start <= date_to:
+            chunk_end = min(chunk_start + step - datetime.timedelta(days=1), date_to)
+            written = SalesRollupService.rebuild(chunk_start, chunk_end)
+            total += written
+            self.stdout.write(f"  {chunk_start} .. {chunk_end}: {written} rows")
+            chunk_start = chunk_end + datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {total} rollup rows for {date_from} .. {date_to} in {time.monotonic() - started:.2f}s"
+        ))
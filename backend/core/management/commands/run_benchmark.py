@@ -0,0 +1,102 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from core import bench
+from core.models import OutletStock
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main API endpoints with concurrent clients and report throughput and "
+        "p50/p95/p99 latency. Runs in-process by default (no server needed); pass --base-url "
+        "to hit a running server. Seed data first with seed_bakery_data."
+    )
+    scenarios = ['login', 'products', 'stock', 'factory_stats']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per client per scenario.")
+        parser.add_argument('--scenarios', default=','.join(self.scenarios))
+        parser.add_argument('--base-url', help="e.g. http://localhost:8000 (default: in-process)")
+        parser.add_argument('--username', default='bench_admin')
+        parser.add_argument('--password', default='bench-pass')
+        parser.add_argument('--outlet', type=int, help="Outlet for the stock scenario (default: the one with most stock rows).")
+        parser.add_argument('--output', '-o', help="Write results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(self.scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        outlet_id = options['outlet'] or (
+            OutletStock.objects.values('outlet_id').annotate(n=Count('stock_id')).order_by('-n')
+            .values_list('outlet_id', flat=True).first()
+        )
+        if 'stock' in scenarios and outlet_id is None:
+            raise CommandError("No outlet stock found; run seed_bakery_data first")
+
+        context = bench.in_process() if not options['base_url'] else None
+        if context:
+            context.enable()
+        try:
+            results = self.run(scenarios, outlet_id, options)
+        finally:
+            if context:
+                context.disable()
+
+        report = {
+            'meta': bench.run_metadata(
+                mode='http' if options['base_url'] else 'in-process',
+                clients=options['clients'],
+                requests_per_client=options['requests'],
+            ),
+            'scenarios': results,
+        }
+        for name, stats in results.items():
+            self.stdout.write(
+                f"{name:<15} {stats['throughput_rps']:>9.1f} req/s  p50 {stats['p50_ms']:>8.2f} ms  "
+                f"p95 {stats['p95_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as out:
+                json.dump(report, out, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+    def make_client_factory(self, options, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        if options['base_url']:
+            return lambda: bench.HttpClient(options['base_url'], headers)
+        return lambda: bench.InProcessClient(headers)
+
+    def login(self, options):
+        client = self.make_client_factory(options)()
+        status, body = client.request(
+            'POST', '/api/auth/login', {'username': options['username'], 'password': options['password']}
+        )
+        if status != 200:
+            raise CommandError(f"Login as {options['username']} failed ({status}): {body[:200]!r}")
+        return json.loads(body)['token']
+
+    def run(self, scenarios, outlet_id, options):
+        credentials = {'username': options['username'], 'password': options['password']}
+        paths = {
+            'products': '/api/products',
+            'stock': f'/api/stock/{outlet_id}/',
+            'factory_stats': '/api/factory/stats',
+        }
+        authed = self.make_client_factory(options, self.login(options))
+        anonymous = self.make_client_factory(options)
+
+        results = {}
+        for name in scenarios:
+            if name == 'login':
+                request_fn = lambda client: client.request('POST', '/api/auth/login', credentials)[0] == 200
+                make_client = anonymous
+            else:
+                request_fn = lambda client, path=paths[name]: client.request('GET', path)[0] == 200
+                make_client = authed
+            results[name] = bench.run_load(request_fn, make_client, options['clients'], options['requests'])
+        return results
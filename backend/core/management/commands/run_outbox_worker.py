@@ -0,0 +1,85 @@
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from core import outbox
+from core.models import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Process outbox messages (follow-up work queued by the API) with a pool of worker threads. "
+        "Messages are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several processes, "
+        "on one host or many, can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Worker threads in this process.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Messages claimed per transaction.")
+        parser.add_argument('--once', action='store_true', help="Exit once no message is due.")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Put FAILED messages back in the queue first.")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = OutboxMessage.objects.filter(status=OutboxStatus.FAILED).update(
+                status=OutboxStatus.PENDING, attempts=0, available_at=timezone.now()
+            )
+            self.stdout.write(f"Requeued {count} failed messages")
+
+        workers = options['workers']
+        if workers > 1 and not connection.features.has_select_for_update_skip_locked:
+            # Without SKIP LOCKED (e.g. SQLite) threads would hand out the same messages
+            self.stdout.write(self.style.WARNING(f"{connection.vendor} cannot SKIP LOCKED; using one worker"))
+            workers = 1
+
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+        processed = [0] * workers
+        threads = [
+            threading.Thread(target=self.work, args=(stop, options, processed, n), name=f'outbox-{n}', daemon=True)
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Outbox worker running with {workers} thread(s)")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS(f"Processed {sum(processed)} messages"))
+
+    @staticmethod
+    def work(stop, options, processed, n):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                try:
+                    claimed = outbox.process_batch(limit=options['batch_size'])
+                except Exception:
+                    # e.g. the database went away: keep the thread alive and try again
+                    logger.exception("Outbox batch failed")
+                    if options['once']:
+                        return
+                    stop.wait(settings.OUTBOX_POLL_INTERVAL)
+                    continue
+                processed[n] += claimed
+                if claimed < options['batch_size']:
+                    if options['once']:
+                        return
+                    stop.wait(settings.OUTBOX_POLL_INTERVAL)
+        finally:
+            connection.close()
@@ -0,0 +1,146 @@
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Batch, Employee, Outlet, OutletStock, Payment, PaymentMethod, PaymentStatus,
+    Product, Role, RoleType, Sale, SaleItem, User, MeasurementType,
+)
+from core.services import AuthService, FactoryStatsService, SalesRollupService
+
+CATEGORIES = ['Bread', 'Buns', 'Cakes', 'Pastries', 'Cookies', 'Savouries']
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the core tables with synthetic bakery data for load tests and benchmarks. "
+        "Deterministic for a given --seed; use a new --seed to add more data to the same database. "
+        "Creates bench_<role> users (see --password)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outlets', type=int, default=10)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--batches-per-product', type=int, default=5)
+        parser.add_argument('--days', type=int, default=365, help="Days of sales history.")
+        parser.add_argument('--sales-per-day', type=int, default=50, help="Bills per outlet per day.")
+        parser.add_argument('--lines-per-sale', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--password', default='bench-pass', help="Password for the bench_* users.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        chunk = options['chunk_size']
+        started = time.monotonic()
+        today = timezone.localdate()
+        tag = f"S{options['seed']}"
+
+        with transaction.atomic():
+            users = self.create_users(options['password'])
+            outlets = Outlet.objects.bulk_create([
+                Outlet(outlet_name=f"{tag} Outlet {n}", location=f"Street {n}", contact_no=f"07{n:08d}")
+                for n in range(options['outlets'])
+            ])
+            products = Product.objects.bulk_create([
+                Product(
+                    product_name=f"{tag} {rng.choice(CATEGORIES)} {n}",
+                    category=rng.choice(CATEGORIES),
+                    base_price=Decimal(rng.randrange(50, 5000)) / 10,
+                    shelf_life_days=rng.choice([1, 2, 3, 5, 7]),
+                    measurement_type=rng.choice(MeasurementType.values),
+                )
+                for n in range(options['products'])
+            ])
+            batches = Batch.objects.bulk_create([
+                Batch(
+                    batch_no=f"{tag}-{product.product_id}-{n}",
+                    product=product,
+                    quantity_produced=rng.randrange(100, 1000),
+                    manufactured_date=today - datetime.timedelta(days=n),
+                    expiry_date=today - datetime.timedelta(days=n) + datetime.timedelta(days=product.shelf_life_days),
+                )
+                for product in products
+                for n in range(options['batches_per_product'])
+            ], batch_size=chunk)
+            stock = OutletStock.objects.bulk_create([
+                OutletStock(outlet=outlet, batch=batch, current_quantity=rng.randrange(0, 200))
+                for outlet in outlets
+                for batch in batches
+            ], batch_size=chunk)
+        self.stdout.write(
+            f"{len(users)} users, {len(outlets)} outlets, {len(products)} products, "
+            f"{len(batches)} batches, {len(stock)} stock rows"
+        )
+
+        employee = Employee.objects.filter(user__username='bench_salesperson').first()
+        sales = self.create_sales(rng, outlets, batches, employee, options, tag)
+        self.stdout.write(f"{sales} sales")
+
+        # Derived tables (bulk_create skips the signals that maintain them)
+        FactoryStatsService.rebuild()
+        if sales:
+            SalesRollupService.rebuild(today - datetime.timedelta(days=options['days']), today)
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {time.monotonic() - started:.1f}s"))
+
+    def create_users(self, password):
+        users = []
+        for role_name in [RoleType.ADMIN, RoleType.MANAGER, RoleType.SALESPERSON, RoleType.FACTORY_DISTRIBUTOR]:
+            role, _ = Role.objects.get_or_create(role_name=role_name)
+            user, created = User.objects.get_or_create(
+                username=f"bench_{role_name.lower()}",
+                defaults={'password_hash': AuthService.hash_password(password), 'role': role},
+            )
+            if created and role_name == RoleType.SALESPERSON:
+                Employee.objects.create(
+                    user=user, first_name='Bench', last_name='Till', nic=f"BENCH{user.user_id}",
+                    hire_date=timezone.localdate(),
+                )
+            users.append(user)
+        return users
+
+    def create_sales(self, rng, outlets, batches, employee, options, tag):
+        """Sales for every outlet and day, written one day at a time in bulk."""
+        today = timezone.localdate()
+        total = 0
+        for day_offset in range(options['days'], 0, -1):
+            day = today - datetime.timedelta(days=day_offset)
+            opening = timezone.make_aware(datetime.datetime.combine(day, datetime.time(7)))
+            sales, lines = [], []
+            for outlet in outlets:
+                for n in range(options['sales_per_day']):
+                    picked = rng.sample(batches, min(options['lines_per_sale'], len(batches)))
+                    items = [(batch, rng.randint(1, 5)) for batch in picked]
+                    gross = sum((batch.product.base_price * qty for batch, qty in items), Decimal('0'))
+                    sales.append(Sale(
+                        bill_no=f"{tag}-{day:%Y%m%d}-{outlet.outlet_id}-{n}",
+                        outlet=outlet,
+                        employee=employee,
+                        sale_date=opening + datetime.timedelta(seconds=rng.randrange(12 * 3600)),
+                        total_amount=gross,
+                        discount_amount=Decimal('0'),
+                        net_amount=gross,
+                    ))
+                    lines.append(items)
+
+            with transaction.atomic():
+                Sale.objects.bulk_create(sales, batch_size=options['chunk_size'])
+                SaleItem.objects.bulk_create([
+                    SaleItem(sale=sale, batch=batch, quantity=qty,
+                             unit_price=batch.product.base_price, subtotal=batch.product.base_price * qty)
+                    for sale, items in zip(sales, lines)
+                    for batch, qty in items
+                ], batch_size=options['chunk_size'])
+                Payment.objects.bulk_create([
+                    Payment(sale=sale, amount=sale.net_amount, payment_method=rng.choice(PaymentMethod.values),
+                            payment_status=PaymentStatus.SUCCESS, payment_date=sale.sale_date)
+                    for sale in sales
+                ], batch_size=options['chunk_size'])
+            total += len(sales)
+        return total
@@ -0,0 +1,68 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.ledger import StockLedger
+from core.models import JobCheckpoint
+from core.services import ExpiryService
+
+
+class Command(BaseCommand):
+    help = (
+        "Zero outlet stock whose batch has expired and record EXPIRED_AUTOMATIC wastage. "
+        "Works in chunks and resumes from the last committed chunk if interrupted; "
+        "a run that completes starts the next one from the beginning."
+    )
+    job_name = 'sweep_expired_stock'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Sweep batches expiring before this date (YYYY-MM-DD). Default: today.")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--restart', action='store_true', help="Ignore the saved checkpoint.")
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = datetime.date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        chunk_size = options['chunk_size']
+
+        # Expired batches are no longer sold; apply their pending ledger sales so the
+        # swept quantities are what was really left
+        if StockLedger.enabled():
+            while StockLedger.flush(limit=chunk_size) == chunk_size:
+                pass
+
+        # A checkpoint only applies to a run with the same cutoff date
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(job_name=self.job_name)
+        if options['restart'] or checkpoint.run_key != cutoff.isoformat():
+            checkpoint.run_key = cutoff.isoformat()
+            checkpoint.position = 0
+            checkpoint.save()
+        elif checkpoint.position:
+            self.stdout.write(f"Resuming after stock_id {checkpoint.position}")
+
+        total = 0
+        started = time.monotonic()
+        while True:
+            rows = ExpiryService.sweep_chunk(cutoff, after=checkpoint.position, limit=chunk_size)
+            if rows:
+                checkpoint.position = rows[-1][0]
+                checkpoint.save(update_fields=['position', 'updated_at'])
+                total += len(rows)
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"  {total} rows swept ({total / elapsed:,.0f} rows/s)")
+            if len(rows) < chunk_size:
+                break
+
+        # Done: a later run with the same cutoff must rescan rows that expired since
+        checkpoint.position = 0
+        checkpoint.save(update_fields=['position', 'updated_at'])
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Swept {total} expired stock rows in {elapsed:.2f}s ({rate:,.0f} rows/s)"
+        ))
@@ -0,0 +1,133 @@
+"""
+In-process request metrics: SQL query count, DB time, serializer time and latency.
+
+RequestMetricsMiddleware fills a RequestMetrics object per request (through a
+context variable, so nested code can add to it), reports it as a Server-Timing
+header and folds it into per-route histograms exposed by MetricsView.
+Numbers are per process; each worker keeps its own.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'started')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_metrics():
+    return _current.get()
+
+
+def query_timer(execute, sql, params, many, context):
+    """connection.execute_wrapper hook: counts and times every SQL statement."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    connection_created receiver: put query_timer on every connection, whichever
+    thread opens it (sync_to_async workers included). It is a no-op outside a request.
+    """
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+@contextmanager
+def serializer_timer():
+    """Wrap serializer work (validation, .data) so it shows up as 'ser' timing."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serializer_time += time.perf_counter() - started
+
+
+def query_budget(view_class, method):
+    """A view's `query_budget`: an int, or a dict of per-method ints (None if undeclared)."""
+    budget = getattr(view_class, 'query_budget', None)
+    return budget.get(method) if isinstance(budget, dict) else budget
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: above the largest bucket
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f"le_{bound}" for bound in self.buckets] + ['inf']
+        return {'count': self.count, 'sum': round(self.total, 3), 'buckets': dict(zip(labels, self.counts))}
+
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, metrics):
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {
+                    'latency_ms': Histogram(LATENCY_BUCKETS_MS),
+                    'db_ms': Histogram(LATENCY_BUCKETS_MS),
+                    'serializer_ms': Histogram(LATENCY_BUCKETS_MS),
+                    'queries': Histogram(QUERY_BUCKETS),
+                }
+            histograms['latency_ms'].observe(metrics.elapsed * 1000)
+            histograms['db_ms'].observe(metrics.db_time * 1000)
+            histograms['serializer_ms'].observe(metrics.serializer_time * 1000)
+            histograms['queries'].observe(metrics.queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: {name: histogram.as_dict() for name, histogram in histograms.items()}
+                for route, histograms in self._routes.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = MetricsRegistry()
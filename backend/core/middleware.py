@@ -0,0 +1,73 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request: SQL query count and time (all database aliases),
+    serializer time (see metrics.serializer_timer) and total latency.
+
+    - Adds a Server-Timing header (db, ser, total; durations in ms).
+    - Records per-route histograms in metrics.registry.
+    - Logs a warning when a view exceeds its `query_budget` class attribute.
+    Queries are counted by metrics.query_timer, which is installed on every
+    connection as it opens (in any thread, so ORM calls made through
+    sync_to_async under ASGI count too) and reads the request's metrics from
+    a context variable.
+    The RequestMetrics object is also left on `response.request_metrics` for tests.
+    Queries run while a streaming response is consumed are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Stay async under ASGI so async views are not pushed onto a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics._current.reset(token)
+        return self.finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        request_metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics._current.reset(token)
+        return self.finish(request, response, request_metrics)
+
+    @staticmethod
+    def start():
+        request_metrics = metrics.RequestMetrics()
+        return request_metrics, metrics._current.set(request_metrics)
+
+    def finish(self, request, response, request_metrics):
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        metrics.registry.observe(route, request_metrics)
+
+        response['Server-Timing'] = (
+            f'db;dur={request_metrics.db_time * 1000:.2f};desc="{request_metrics.queries} queries", '
+            f'ser;dur={request_metrics.serializer_time * 1000:.2f}, '
+            f'total;dur={request_metrics.elapsed * 1000:.2f}'
+        )
+        response.request_metrics = request_metrics
+
+        budget = metrics.query_budget(getattr(match.func, 'view_class', None), request.method) if match else None
+        if budget is not None and request_metrics.queries > budget:
+            logger.warning("%s %s ran %d queries (budget %d)", request.method, route, request_metrics.queries, budget)
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['manufactured_date'], name='batch_mfg_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(fields=['expiry_date'], name='batch_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['status'], name='cust_order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='outletstock',
+            index=models.Index(condition=models.Q(('current_quantity__gt', 0)), fields=['outlet'], include=('batch', 'current_quantity'), name='outlet_stock_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['outlet', 'sale_date'], name='sale_outlet_date_idx'),
+        ),
+    ]
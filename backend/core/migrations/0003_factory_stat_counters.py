@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:42
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    """Start the counters from the data already in the tables."""
+    StatCounter = apps.get_model('core', 'StatCounter')
+    CustomerOrder = apps.get_model('core', 'CustomerOrder')
+    Batch = apps.get_model('core', 'Batch')
+
+    counters = [
+        StatCounter(counter_key=f"orders.status.{row['status']}", value=row['total'])
+        for row in CustomerOrder.objects.values('status').annotate(total=Count('order_id')).order_by()
+    ]
+    counters += [
+        StatCounter(counter_key=f"batches.produced.{row['manufactured_date']}", value=row['total'])
+        for row in Batch.objects.values('manufactured_date').annotate(total=Count('batch_id')).order_by()
+    ]
+    StatCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FactoryActivity',
+            fields=[
+                ('activity_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('action', models.CharField(max_length=50)),
+                ('details', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'factory_activity',
+            },
+        ),
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('counter_key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'stat_counters',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_factory_stat_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('job_name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('run_key', models.CharField(blank=True, default='', max_length=100)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'job_checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:45
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_job_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestockRequest',
+            fields=[
+                ('restock_id', models.AutoField(primary_key=True, serialize=False)),
+                ('requested_quantity', models.IntegerField()),
+                ('forecast_daily_demand', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('current_stock', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('GENERATED', 'Generated'), ('SENT_TO_FACTORY', 'Sent to Factory'), ('DISPATCHED', 'Dispatched'), ('RECEIVED', 'Received')], default='GENERATED', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.outlet')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product')),
+            ],
+            options={
+                'db_table': 'restock_requests',
+                'indexes': [models.Index(fields=['status', 'outlet'], name='restock_status_outlet_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacityReservation',
+            fields=[
+                ('reservation_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('pickup_date', models.DateField()),
+                ('reserved_quantity', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'capacity_reservations',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductionCapacity',
+            fields=[
+                ('capacity_id', models.AutoField(primary_key=True, serialize=False)),
+                ('daily_capacity', models.PositiveIntegerField()),
+            ],
+            options={
+                'db_table': 'production_capacity',
+            },
+        ),
+        migrations.AlterField(
+            model_name='customerorder',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PREPARING', 'Preparing'), ('READY_FOR_PICKUP', 'Ready for Pickup'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('DISPATCHED', 'Dispatched'), ('QUEUED', 'Queued (over capacity)')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['pickup_date', 'status'], name='cust_order_pickup_idx'),
+        ),
+        migrations.AddField(
+            model_name='capacityreservation',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.product'),
+        ),
+        migrations.AddField(
+            model_name='productioncapacity',
+            name='product',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='core.product'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='capacityreservation',
+            unique_together={('pickup_date', 'product')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_production_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockJournalEntry',
+            fields=[
+                ('entry_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.outlet')),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.sale')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.outletstock')),
+            ],
+            options={
+                'db_table': 'stock_journal',
+                'indexes': [models.Index(fields=['outlet', 'created_at'], name='stock_journal_outlet_idx')],
+            },
+        ),
+    ]
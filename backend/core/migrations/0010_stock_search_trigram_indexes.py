@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Till lookups (StockLookupService) match batch_no by prefix and product names by
+# substring with ILIKE; pg_trgm GIN indexes serve both. Other databases use the
+# in-process prefix index in core/search.py instead, so this is PostgreSQL only.
+TRIGRAM_INDEXES = [
+    ('batch_no_trgm_idx', 'batches', 'batch_no'),
+    ('product_name_trgm_idx', 'products', 'product_name'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_stock_journal'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
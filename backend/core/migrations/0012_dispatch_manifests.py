@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_outbox_messages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchManifest',
+            fields=[
+                ('manifest_id', models.AutoField(primary_key=True, serialize=False)),
+                ('dispatched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('dispatched_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.user')),
+            ],
+            options={
+                'db_table': 'dispatch_manifests',
+            },
+        ),
+        migrations.CreateModel(
+            name='DispatchLine',
+            fields=[
+                ('line_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('DISPATCHED', 'Dispatched'), ('RECEIVED', 'Received')], default='DISPATCHED', max_length=20)),
+                ('received_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.batch')),
+                ('outlet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.outlet')),
+                ('manifest', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='core.dispatchmanifest')),
+            ],
+            options={
+                'db_table': 'dispatch_lines',
+                'unique_together': {('manifest', 'batch', 'outlet')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_dispatch_manifests'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='outletstock',
+            constraint=models.CheckConstraint(condition=models.Q(('current_quantity__gte', 0)), name='outlet_stock_quantity_non_negative'),
+        ),
+    ]
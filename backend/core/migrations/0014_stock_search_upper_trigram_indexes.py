@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Django compiles istartswith / icontains / iexact on PostgreSQL to
+# UPPER(column::text) LIKE UPPER(...), which the bare-column indexes of 0010
+# cannot serve. Index that expression instead. PostgreSQL only; other
+# databases run the same query without an index.
+OLD_INDEXES = [
+    ('batch_no_trgm_idx', 'batches', 'batch_no'),
+    ('product_name_trgm_idx', 'products', 'product_name'),
+]
+UPPER_INDEXES = [
+    ('batch_no_upper_trgm_idx', 'batches', 'batch_no'),
+    ('product_name_upper_trgm_idx', 'products', 'product_name'),
+]
+
+
+def create_upper_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in UPPER_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+    for name, _, _ in OLD_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+def restore_column_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in OLD_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)')
+    for name, _, _ in UPPER_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_outlet_stock_non_negative'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_indexes, restore_column_indexes),
+    ]
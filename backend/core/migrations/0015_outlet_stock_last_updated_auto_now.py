@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_stock_search_upper_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outletstock',
+            name='last_updated',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+    ]
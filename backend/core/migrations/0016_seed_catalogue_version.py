@@ -0,0 +1,26 @@
+import time
+
+from django.db import migrations
+
+CATALOGUE_VERSION_KEY = 'catalogue.version'
+
+
+def seed_catalogue_version(apps, schema_editor):
+    """Create the version row up front, so reads and Product writes never have to."""
+    StatCounter = apps.get_model('core', 'StatCounter')
+    StatCounter.objects.get_or_create(counter_key=CATALOGUE_VERSION_KEY, defaults={'value': time.time_ns()})
+
+
+def drop_catalogue_version(apps, schema_editor):
+    apps.get_model('core', 'StatCounter').objects.filter(counter_key=CATALOGUE_VERSION_KEY).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_outlet_stock_last_updated_auto_now'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_catalogue_version, drop_catalogue_version),
+    ]
@@ -19,6 +19,7 @@ class OrderStatus(models.TextChoices):
     COMPLETED = 'COMPLETED', 'Completed'
     CANCELLED = 'CANCELLED', 'Cancelled'
     DISPATCHED = 'DISPATCHED', 'Dispatched'
+    QUEUED = 'QUEUED', 'Queued (over capacity)'
 
 class EmploymentStatus(models.TextChoices):
     ACTIVE = 'ACTIVE', 'Active'
@@ -59,6 +60,14 @@ class WastageReason(models.TextChoices):
     PRODUCTION_FAILURE = 'PRODUCTION_FAILURE', 'Production Failure'
     OTHER = 'OTHER', 'Other'
 
+class DispatchStatus(models.TextChoices):
+    DISPATCHED = 'DISPATCHED', 'Dispatched'
+    RECEIVED = 'RECEIVED', 'Received'
+
+class OutboxStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    FAILED = 'FAILED', 'Failed (out of retries)'
+
 # ==========================================
 # 2. MODELS (The Tables)
 # ==========================================
@@ -132,6 +141,12 @@ class Batch(models.Model):
 
     class Meta:
         db_table = 'batches'
+        indexes = [
+            # Factory stats: batches produced per day
+            models.Index(fields=['manufactured_date'], name='batch_mfg_date_idx'),
+            # FIFO ordering and expiry sweeps
+            models.Index(fields=['expiry_date'], name='batch_expiry_idx'),
+        ]
 
     def __str__(self):
         return self.batch_no
@@ -157,12 +172,34 @@ class OutletStock(models.Model):
     batch = models.ForeignKey(Batch, on_delete=models.CASCADE)
     current_quantity = models.IntegerField(default=0)
     minimum_stock_level = models.IntegerField(default=10, blank=True, null=True)
-    last_updated = models.DateTimeField(default=timezone.now, blank=True, null=True)
+    # Every save() moves the stock ETag; .update() callers set it themselves
+    last_updated = models.DateTimeField(auto_now=True, null=True)
     status = models.CharField(max_length=255, blank=True, null=True)
 
     class Meta:
         db_table = 'outlet_stock'
         unique_together = (('outlet', 'batch'),)
+        indexes = [
+            # Available stock per outlet (get_stock_for_outlet / checkout).
+            # Partial so sold-out rows never bloat it; covering on Postgres.
+            models.Index(
+                fields=['outlet'],
+                name='outlet_stock_available_idx',
+                condition=models.Q(current_quantity__gt=0),
+                include=['batch', 'current_quantity'],
+            ),
+        ]
+        constraints = [
+            # Every writer guards its decrement; this backs them up (see StockLedger.flush)
+            models.CheckConstraint(condition=models.Q(current_quantity__gte=0), name='outlet_stock_quantity_non_negative'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # auto_now is skipped when update_fields leaves it out
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'last_updated' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'last_updated']
+        super().save(*args, **kwargs)
 
 class Employee(models.Model):
     employee_id = models.AutoField(primary_key=True)
@@ -202,6 +239,12 @@ class CustomerOrder(models.Model):
 
     class Meta:
         db_table = 'customer_orders'
+        indexes = [
+            # Factory stats: orders counted per status
+            models.Index(fields=['status'], name='cust_order_status_idx'),
+            # Production plan / capacity rebuilds: orders per pickup date
+            models.Index(fields=['pickup_date', 'status'], name='cust_order_pickup_idx'),
+        ]
 
 class CustomerOrderItem(models.Model):
     order_item_id = models.AutoField(primary_key=True)
@@ -227,6 +270,10 @@ class Sale(models.Model):
 
     class Meta:
         db_table = 'sales'
+        indexes = [
+            # Outlet sales history and reports by date range
+            models.Index(fields=['outlet', 'sale_date'], name='sale_outlet_date_idx'),
+        ]
 
 class SaleItem(models.Model):
     sale_item_id = models.AutoField(primary_key=True)
@@ -263,4 +310,193 @@ class Wastage(models.Model):
     notes = models.TextField(blank=True, null=True)
 
     class Meta:
-        db_table = 'wastage'
\ No newline at end of file
+        db_table = 'wastage'
+
+class RestockRequest(models.Model):
+    restock_id = models.AutoField(primary_key=True)
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    requested_quantity = models.IntegerField()
+    forecast_daily_demand = models.DecimalField(max_digits=10, decimal_places=2)
+    current_stock = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=RestockStatus.choices, default=RestockStatus.GENERATED)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'restock_requests'
+        indexes = [
+            models.Index(fields=['status', 'outlet'], name='restock_status_outlet_idx'),
+        ]
+
+class ProductionCapacity(models.Model):
+    """How many units of a product the factory can make per day (no row = unlimited)."""
+    capacity_id = models.AutoField(primary_key=True)
+    product = models.OneToOneField(Product, on_delete=models.CASCADE)
+    daily_capacity = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = 'production_capacity'
+
+class DispatchManifest(models.Model):
+    """One factory dispatch run: batches split across outlets (DispatchService)."""
+    manifest_id = models.AutoField(primary_key=True)
+    dispatched_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    dispatched_at = models.DateTimeField(default=timezone.now)
+    notes = models.TextField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'dispatch_manifests'
+
+class DispatchLine(models.Model):
+    line_id = models.BigAutoField(primary_key=True)
+    manifest = models.ForeignKey(DispatchManifest, on_delete=models.CASCADE, related_name='lines')
+    batch = models.ForeignKey(Batch, on_delete=models.PROTECT)
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=DispatchStatus.choices, default=DispatchStatus.DISPATCHED)
+    received_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'dispatch_lines'
+        unique_together = (('manifest', 'batch', 'outlet'),)
+
+# ==========================================
+# 3. DERIVED DATA (Counters & Feeds)
+# ==========================================
+
+class StatCounter(models.Model):
+    """
+    Running totals kept up to date by core/signals.py so dashboards
+    never have to COUNT(*) the source tables.
+    """
+    counter_key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'stat_counters'
+
+class FactoryActivity(models.Model):
+    activity_id = models.BigAutoField(primary_key=True)
+    action = models.CharField(max_length=50)
+    details = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'factory_activity'
+
+class JobCheckpoint(models.Model):
+    """Resume point for long-running batch jobs (management commands)."""
+    job_name = models.CharField(max_length=100, primary_key=True)
+    run_key = models.CharField(max_length=100, blank=True, default='')
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'job_checkpoints'
+
+class DailySalesRollup(models.Model):
+    """
+    Completed sales per (outlet, product, day), maintained as sales are written
+    (SalesRollupService) so reports never aggregate raw sale lines.
+    """
+    rollup_id = models.BigAutoField(primary_key=True)
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    sale_day = models.DateField()
+    quantity = models.BigIntegerField(default=0)
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'daily_sales_rollup'
+        unique_together = (('outlet', 'product', 'sale_day'),)
+        indexes = [
+            models.Index(fields=['sale_day'], name='rollup_sale_day_idx'),
+        ]
+
+
+class CapacityReservation(models.Model):
+    """
+    Units of a product already promised to customer orders for a pickup date,
+    kept up to date as orders are placed, cancelled or moved (OrderSchedulingService),
+    so the capacity check at order time is a keyed lookup.
+    """
+    reservation_id = models.BigAutoField(primary_key=True)
+    pickup_date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    reserved_quantity = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'capacity_reservations'
+        unique_together = (('pickup_date', 'product'),)
+
+
+class StockJournalEntry(models.Model):
+    """
+    Stock decrement not yet applied to its OutletStock row (core/ledger.py).
+    Available quantity = current_quantity + the row's pending deltas;
+    flush_stock_ledger folds entries into the rows and deletes them.
+    """
+    entry_id = models.BigAutoField(primary_key=True)
+    outlet = models.ForeignKey(Outlet, on_delete=models.CASCADE)
+    stock = models.ForeignKey(OutletStock, on_delete=models.CASCADE)  # indexed: pending deltas per row
+    sale = models.ForeignKey(Sale, on_delete=models.SET_NULL, blank=True, null=True)
+    delta = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'stock_journal'
+        indexes = [
+            # Per-outlet change detection (conditional GET)
+            models.Index(fields=['outlet', 'created_at'], name='stock_journal_outlet_idx'),
+        ]
+
+
+# ==========================================
+# 4. REQUEST BOOKKEEPING
+# ==========================================
+
+class IdempotencyRecord(models.Model):
+    """
+    Outcome of a write request sent with an Idempotency-Key header (core/idempotency.py).
+    status_code is NULL while the first request is still running.
+    """
+    record_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # sha256 of method, path and body
+    status_code = models.PositiveSmallIntegerField(null=True)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    response_body = models.BinaryField(default=b'')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'idempotency_records'
+        unique_together = (('user', 'key'),)
+        indexes = [
+            # TTL purge (purge_idempotency_keys)
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """
+    Follow-up work recorded in the same transaction as the write that caused it
+    (core/outbox.py) and carried out by run_outbox_worker. Deleted once handled.
+    """
+    message_id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=OutboxStatus.choices, default=OutboxStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # not claimed before this (backoff or lease)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'outbox_messages'
+        indexes = [
+            # Workers claim due PENDING messages, oldest first
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
@@ -0,0 +1,152 @@
+"""
+Transactional outbox for follow-up work (notifications, recalculations).
+
+A view records the work with enqueue() inside the transaction that makes the
+change, so the message exists exactly when the change does, and returns
+without waiting for it. run_outbox_worker claims due messages with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker threads and
+processes can share the table without handing out a message twice.
+
+- A claim is a lease: the claiming transaction only pushes available_at
+  OUTBOX_LEASE seconds ahead and commits, so no row lock is held while
+  handlers run (an SMTP send blocks nobody). If the worker dies, the messages
+  fall due again when the lease runs out.
+- Messages of one topic in a claimed batch go to their handler together
+  (registered with @handler in core/tasks.py), inside a transaction so a
+  failing handler leaves no partial writes behind. If that call fails, the
+  messages are retried one at a time, so one bad payload fails alone instead
+  of holding back (and eventually failing) every message batched with it.
+- A handled message is deleted; a failed one is retried with exponential
+  backoff and marked FAILED after OUTBOX_MAX_ATTEMPTS claims.
+- Handlers may run more than once for a message (a worker can die, or its
+  lease run out, after the handler but before the delete), so they must
+  tolerate repeats.
+"""
+import datetime
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(topic):
+    """Register fn(payloads) as the handler for `topic`; it gets a list of payload dicts."""
+    def register(fn):
+        HANDLERS[topic] = fn
+        return fn
+    return register
+
+
+def enqueue(topic, payload):
+    """Record follow-up work; call inside the transaction that makes the change."""
+    return OutboxMessage.objects.create(topic=topic, payload=payload)
+
+
+def retry_delay(attempts):
+    """Seconds before retry number `attempts`: OUTBOX_RETRY_DELAY doubled per attempt, capped."""
+    return min(settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_MAX_RETRY_DELAY)
+
+
+def claim(limit):
+    """
+    Lease up to `limit` due PENDING messages, skipping rows other workers hold,
+    in one short transaction. Each claim counts as an attempt; messages already
+    out of attempts (their worker died each time) are marked FAILED instead.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxStatus.PENDING, available_at__lte=now)
+            .order_by('available_at', 'message_id')[:limit]
+        )
+        exhausted = [message for message in messages if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS]
+        if exhausted:
+            OutboxMessage.objects.filter(message_id__in=[message.message_id for message in exhausted]).update(
+                status=OutboxStatus.FAILED, last_error="Lease expired on the last attempt"
+            )
+        claimed = [message for message in messages if message.attempts < settings.OUTBOX_MAX_ATTEMPTS]
+        if claimed:
+            OutboxMessage.objects.filter(message_id__in=[message.message_id for message in claimed]).update(
+                available_at=now + datetime.timedelta(seconds=settings.OUTBOX_LEASE),
+                attempts=F('attempts') + 1,
+            )
+    for message in claimed:
+        message.attempts += 1
+    return claimed
+
+
+def run_handler(topic, messages):
+    """Run the topic's handler for `messages` in a transaction; returns the exception, or None."""
+    try:
+        fn = HANDLERS.get(topic)
+        if fn is None:
+            raise LookupError(f"No outbox handler registered for {topic!r}")
+        with transaction.atomic():
+            fn([message.payload for message in messages])
+    except Exception as e:
+        logger.exception("Outbox handler for %r failed (%d messages)", topic, len(messages))
+        return e
+    return None
+
+
+def reschedule(messages, error):
+    """Record `error` on failed messages and back them off, or mark them FAILED once out of attempts."""
+    now = timezone.now()
+    for message in messages:
+        message.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status = OutboxStatus.FAILED
+        else:
+            message.available_at = now + datetime.timedelta(seconds=retry_delay(message.attempts))
+    return messages
+
+
+def process_batch(limit=100):
+    """
+    Business Logic:
+    1. Claim (lease) up to `limit` due messages; see claim().
+    2. Run each topic's handler once for all of its messages, in a transaction so
+       a failing handler leaves no partial writes behind. If it fails, run it again
+       for each message alone, so only the messages that fail by themselves fail.
+    3. Delete the handled messages; reschedule the others with backoff (or mark
+       them FAILED once out of attempts).
+    Returns the number of messages claimed.
+    """
+    messages = claim(limit)
+    by_topic = defaultdict(list)
+    for message in messages:
+        by_topic[message.topic].append(message)
+
+    done, failed = [], []
+    for topic, group in by_topic.items():
+        error = run_handler(topic, group)
+        if error is None:
+            done += group
+            continue
+        if len(group) == 1 or topic not in HANDLERS:
+            failed += reschedule(group, error)
+            continue
+        for message in group:
+            error = run_handler(topic, [message])
+            if error is None:
+                done.append(message)
+            else:
+                failed += reschedule([message], error)
+
+    with transaction.atomic():
+        if done:
+            OutboxMessage.objects.filter(message_id__in=[message.message_id for message in done]).delete()
+        if failed:
+            OutboxMessage.objects.bulk_update(failed, ['last_error', 'status', 'available_at'])
+    return len(messages)
+
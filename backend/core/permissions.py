@@ -11,4 +11,8 @@ class IsFactoryDistributor(permissions.BasePermission):
 
 class IsSalesperson(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role.role_name == 'SALESPERSON'
\ No newline at end of file
+        return request.user.is_authenticated and request.user.role.role_name == 'SALESPERSON'
+
+class IsManager(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role.role_name == 'MANAGER'
@@ -0,0 +1,90 @@
+"""
+Sliding-window rate limits kept in the default cache.
+
+Used by LoginView to turn brute-force storms away before any password hashing:
+per client IP every attempt counts, per username only failed attempts count.
+With a shared cache (CACHE_URL) the limits hold across workers; with the
+local-memory cache they are per process.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class SlidingWindowRateLimiter:
+    """
+    Approximate sliding window: the previous fixed window's count is weighted by
+    how much of it still overlaps the sliding window, plus the current count.
+    Costs one get_many to check and one incr to record, whatever the limit.
+    """
+
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def _key(self, subject, index):
+        # Hashed so any username is a valid (short, space free) cache key
+        digest = hashlib.sha1(str(subject).encode()).hexdigest()[:24]
+        return f'ratelimit:{self.scope}:{digest}:{index}'
+
+    def retry_after(self, subject, now=None):
+        """Seconds until `subject` may try again, or 0 if it is under the limit."""
+        now = time.time() if now is None else now
+        index, elapsed = divmod(now, self.window)
+        current_key, previous_key = self._key(subject, int(index)), self._key(subject, int(index) - 1)
+        counts = cache.get_many([current_key, previous_key])
+        weight = 1 - elapsed / self.window
+        if counts.get(previous_key, 0) * weight + counts.get(current_key, 0) < self.limit:
+            return 0
+        return max(1, math.ceil(self.window - elapsed))
+
+    def hit(self, subject, now=None):
+        now = time.time() if now is None else now
+        key = self._key(subject, int(now // self.window))
+        try:
+            cache.incr(key)
+        except ValueError:
+            # First hit in this window; add() loses only to a concurrent first hit
+            if not cache.add(key, 1, timeout=2 * self.window):
+                cache.incr(key)
+
+
+class LoginRateLimit:
+    """LOGIN_RATE_LIMITS = {'ip': (attempts, seconds), 'username': (failures, seconds)}; omit a scope to disable it."""
+
+    @staticmethod
+    def limiter(scope):
+        rule = getattr(settings, 'LOGIN_RATE_LIMITS', {}).get(scope)
+        return SlidingWindowRateLimiter(f'login.{scope}', *rule) if rule else None
+
+    @staticmethod
+    def client_ip(request):
+        # REMOTE_ADDR only: X-Forwarded-For is client controlled unless a trusted proxy rewrites it
+        return request.META.get('REMOTE_ADDR', '')
+
+    @staticmethod
+    def check(request, username):
+        """
+        Return the Retry-After seconds if the client IP or the username is over its
+        limit, else record the attempt against the IP and return 0.
+        """
+        user_limiter = LoginRateLimit.limiter('username')
+        ip_limiter = LoginRateLimit.limiter('ip')
+        ip = LoginRateLimit.client_ip(request)
+        wait = max(
+            user_limiter.retry_after(username) if user_limiter else 0,
+            ip_limiter.retry_after(ip) if ip_limiter else 0,
+        )
+        if not wait and ip_limiter:
+            ip_limiter.hit(ip)
+        return wait
+
+    @staticmethod
+    def record_failure(username):
+        user_limiter = LoginRateLimit.limiter('username')
+        if user_limiter:
+            user_limiter.hit(username)
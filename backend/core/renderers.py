@@ -0,0 +1,58 @@
+"""
+Fast JSON rendering for the list endpoints.
+
+FastJSONRenderer writes exactly the bytes DRF's JSONRenderer writes (compact
+separators, UTF-8 output, U+2028/U+2029 escaped, DRF's encoder for dates,
+times and UUIDs) but encodes with orjson when it is installed. Anything orjson
+cannot reproduce byte for byte is handed to the stdlib path: pretty printing,
+non-default UNICODE_JSON / COMPACT_JSON settings, Decimals (DRF writes them as
+floats), non-string keys and out-of-range integers.
+
+orjson formats floats in exponent form differently ("1e16" vs "1e+16"), so use
+this renderer only for payloads without floats. The list endpoints return ints,
+strings and Decimal-as-string prices.
+"""
+import datetime
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to DRF's stdlib encoder
+    orjson = None
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        raise TypeError("Decimal goes through the stdlib encoder")
+    if isinstance(obj, datetime.time) and obj.utcoffset() is not None:
+        raise TypeError("aware time goes through the stdlib encoder")
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    orjson_options = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None or orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=self.orjson_options)
+        except TypeError:  # orjson.JSONEncodeError is a TypeError
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def render_json(data):
+    """Encode `data` as the API's JSON bytes (same output as a DRF Response)."""
+    return FastJSONRenderer().render(data)
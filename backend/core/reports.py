@@ -0,0 +1,193 @@
+"""
+Sales reporting.
+
+Exports stream straight from the database: rows are pulled with
+.iterator(chunk_size=...) (a server-side cursor on Postgres) and written out
+chunk by chunk, so memory stays flat whatever the date range.
+"""
+import csv
+import datetime
+import io
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from core.models import DailySalesRollup, SaleItem
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for Parquet exports
+    pa = pq = None
+
+
+SALES_EXPORT_COLUMNS = [
+    ('sale_id', 'sale__sale_id'),
+    ('bill_no', 'sale__bill_no'),
+    ('sale_date', 'sale__sale_date'),
+    ('outlet_id', 'sale__outlet_id'),
+    ('outlet_name', 'sale__outlet__outlet_name'),
+    ('product_id', 'batch__product_id'),
+    ('product_name', 'batch__product__product_name'),
+    ('batch_no', 'batch__batch_no'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'unit_price'),
+    ('subtotal', 'subtotal'),
+    ('sale_discount', 'sale__discount_amount'),
+    ('sale_net', 'sale__net_amount'),
+    ('status', 'sale__status'),
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def day_range(date_from, date_to):
+    """Aware datetimes covering date_from 00:00 up to (not including) the day after date_to."""
+    start = timezone.make_aware(datetime.datetime.combine(date_from, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min))
+    return start, end
+
+
+def sales_rows(date_from, date_to, outlet_id=None, chunk_size=2000):
+    """
+    Yield one tuple per SaleItem (columns as SALES_EXPORT_COLUMNS), oldest sale first.
+    """
+    start, end = day_range(date_from, date_to)
+    items = SaleItem.objects.filter(sale__sale_date__gte=start, sale__sale_date__lt=end)
+    if outlet_id:
+        items = items.filter(sale__outlet_id=outlet_id)
+    items = items.order_by('sale__sale_date', 'sale_item_id')
+    return items.values_list(*[path for _, path in SALES_EXPORT_COLUMNS]).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(rows, rows_per_chunk=2000):
+    """Encode rows as CSV, yielding one string per `rows_per_chunk` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in SALES_EXPORT_COLUMNS])
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(rows, rows_per_chunk=50000):
+    """Encode rows as Parquet, one row group per `rows_per_chunk` rows."""
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet exports (pip install pyarrow)")
+
+    schema = pa.schema([
+        ('sale_id', pa.int64()),
+        ('bill_no', pa.string()),
+        ('sale_date', pa.timestamp('us', tz='UTC')),
+        ('outlet_id', pa.int64()),
+        ('outlet_name', pa.string()),
+        ('product_id', pa.int64()),
+        ('product_name', pa.string()),
+        ('batch_no', pa.string()),
+        ('quantity', pa.int64()),
+        ('unit_price', pa.decimal128(10, 2)),
+        ('subtotal', pa.decimal128(10, 2)),
+        ('sale_discount', pa.decimal128(10, 2)),
+        ('sale_net', pa.decimal128(10, 2)),
+        ('status', pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def flush(chunk):
+        columns = list(zip(*chunk))
+        writer.write_table(pa.Table.from_arrays([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+        return sink.drain()
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == rows_per_chunk:
+            yield flush(chunk)
+            chunk = []
+    if chunk:
+        yield flush(chunk)
+    writer.close()
+    yield sink.drain()
+
+
+def export_sales(fmt, date_from, date_to, outlet_id=None):
+    """Return a generator of str (CSV) or bytes (Parquet) chunks."""
+    rows = sales_rows(date_from, date_to, outlet_id)
+    if fmt == 'parquet':
+        return iter_parquet(rows)
+    return iter_csv(rows)
+
+
+PERFORMANCE_GROUPS = {
+    'outlet': ('outlet_id', 'outlet__outlet_name'),
+    'product': ('product_id', 'product__product_name'),
+    'day': ('sale_day',),
+}
+
+
+def _money(value):
+    return str(Decimal(value or 0).quantize(Decimal('0.01')))
+
+
+def outlet_performance(date_from, date_to, outlet_id=None, group_by='outlet'):
+    """
+    Sales totals for a date range, read only from DailySalesRollup, so the cost
+    depends on outlets x products x days in range, not on the number of sales.
+    """
+    rollups = DailySalesRollup.objects.filter(sale_day__gte=date_from, sale_day__lte=date_to)
+    if outlet_id:
+        rollups = rollups.filter(outlet_id=outlet_id)
+    keys = PERFORMANCE_GROUPS[group_by]
+    rows = (
+        rollups.values(*keys)
+        .annotate(
+            quantity=Sum('quantity'),
+            gross_amount=Sum('gross_amount'),
+            discount_amount=Sum('discount_amount'),
+            net_amount=Sum('net_amount'),
+        )
+        .order_by(*keys)
+    )
+    return [
+        {
+            **{key.split('__')[-1]: row[key] for key in keys},
+            'quantity': row['quantity'],
+            'gross_amount': _money(row['gross_amount']),
+            'discount_amount': _money(row['discount_amount']),
+            'net_amount': _money(row['net_amount']),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,53 @@
+"""
+Read-replica routing for the read-only views.
+
+Reads go to the 'replica' alias only inside read_from_replica() (a context
+variable, so it follows the request through threads and sync_to_async), and
+only when that alias is configured (DB_REPLICA_HOST). Everything else, and
+every write, uses 'default'. The replica may lag slightly behind the primary;
+code that caches what it reads for long (the catalogue cache) reads from the
+primary instead.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # same data on both aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaReadMixin:
+    """APIView mixin: safe-method requests (GET/HEAD/OPTIONS) read from the replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return super().dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
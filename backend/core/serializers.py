@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Product, Batch, OutletStock
+from .models import Product, Batch, OutletStock, PaymentMethod
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -29,6 +29,20 @@ class BatchCreateSerializer(serializers.ModelSerializer):
         fields = ['batch_no', 'product_id', 'quantity_produced', 'manufactured_date', 'expiry_date']
 
 
+class BatchImportRowSerializer(BatchCreateSerializer):
+    """
+    One row of a bulk batch import. Field validation only: product existence and
+    batch_no uniqueness are checked for all rows at once by BatchImportService.
+    """
+    class Meta(BatchCreateSerializer.Meta):
+        extra_kwargs = {'batch_no': {'validators': []}}
+
+    def validate(self, attrs):
+        if attrs['expiry_date'] < attrs['manufactured_date']:
+            raise serializers.ValidationError({'expiry_date': 'Expiry date is before manufactured date.'})
+        return attrs
+
+
 class BatchSerializer(serializers.ModelSerializer):
     """
     Serializer for VIEWING batches (includes full product details).
@@ -48,4 +62,66 @@ class OutletStockSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OutletStock
-        fields = ['stock_id', 'current_quantity', 'batch', 'product_name', 'batch_no', 'price']
\ No newline at end of file
+        fields = ['stock_id', 'current_quantity', 'batch', 'product_name', 'batch_no', 'price']
+
+class CheckoutItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """
+    Serializer for a full POS bill posted in one request.
+    Lines are given per product; batches are picked server-side (FIFO).
+    """
+    outlet_id = serializers.IntegerField()
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+    payment_method = serializers.ChoiceField(choices=PaymentMethod.choices)
+    discount_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False, default=0)
+    customer_id = serializers.IntegerField(required=False, allow_null=True)
+    bill_no = serializers.CharField(max_length=50, required=False)
+    reference_no = serializers.CharField(max_length=100, required=False, allow_null=True)
+
+
+class CustomerOrderSerializer(serializers.Serializer):
+    """
+    Serializer for a customer advance order (pickup at an outlet).
+    customer_id is only read for staff placing an order on a customer's behalf;
+    the 24-hour lead time is checked by OrderSchedulingService.place_order.
+    """
+    outlet_id = serializers.IntegerField()
+    pickup_date = serializers.DateField()
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+    special_instructions = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    customer_id = serializers.IntegerField(required=False)
+    queue_if_full = serializers.BooleanField(required=False, default=False)
+
+
+class DispatchAllocationSerializer(serializers.Serializer):
+    outlet_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class DispatchBatchSerializer(serializers.Serializer):
+    """One batch of a dispatch: explicit allocations, or outlet_ids to split what is left evenly."""
+    batch_id = serializers.IntegerField()
+    allocations = DispatchAllocationSerializer(many=True, required=False, allow_empty=False)
+    outlet_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        if ('allocations' in attrs) == ('outlet_ids' in attrs):
+            raise serializers.ValidationError("Give either allocations or outlet_ids")
+        if 'allocations' in attrs:
+            outlet_ids = [allocation['outlet_id'] for allocation in attrs['allocations']]
+            if len(set(outlet_ids)) != len(outlet_ids):
+                raise serializers.ValidationError({'allocations': "Each outlet may appear only once per batch"})
+            attrs['allocations'] = {a['outlet_id']: a['quantity'] for a in attrs['allocations']}
+        else:
+            attrs['outlet_ids'] = list(dict.fromkeys(attrs['outlet_ids']))
+        return attrs
+
+
+class DispatchSerializer(serializers.Serializer):
+    batches = DispatchBatchSerializer(many=True, allow_empty=False)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    receive = serializers.BooleanField(required=False, default=True)
@@ -1,5 +1,86 @@
+import csv
+import datetime
+import io
+import json
+import logging
+import time
+import uuid
+from urllib.parse import quote
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.db import IntegrityError, connection, router, transaction
+from django.db.models import BigIntegerField, Case, Count, DecimalField, F, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import Greatest, TruncDate
 from django.utils import timezone
-from .models import OutletStock, Product
+from django.utils.crypto import constant_time_compare
+from .models import (
+    OutletStock, Product, Sale, SaleItem, Payment, PaymentStatus,
+    Batch, CustomerOrder, OrderStatus, StatCounter, FactoryActivity,
+    Wastage, WastageReason, DailySalesRollup, SaleStatus,
+    Customer, CustomerOrderItem, ProductionCapacity, CapacityReservation,
+    Outlet, RestockRequest, RestockStatus, DispatchManifest, DispatchLine, DispatchStatus,
+)
+from .ledger import StockLedger
+from .outbox import enqueue
+from .events import FACTORY_CHANNEL, get_broker, outlet_channel, publish_on_commit, stock_event
+from .metrics import serializer_timer
+from .renderers import render_json
+from .serializers import BatchImportRowSerializer, ProductSerializer
+from rest_framework.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(Exception):
+    """Raised when an outlet cannot cover the quantity requested for a product."""
+
+
+class CapacityExceededError(Exception):
+    """Raised when an order needs more than a product's remaining daily capacity."""
+
+    def __init__(self, shortages):
+        # {product_id: (requested, remaining)}
+        self.shortages = shortages
+        super().__init__(f"Over daily capacity for product(s): {sorted(shortages)}")
+
+
+class AuthService:
+    @staticmethod
+    def hash_password(raw_password):
+        """Hash with the preferred hasher (core.hashers, PASSWORD_HASH_ITERATIONS)."""
+        return make_password(raw_password)
+
+    @staticmethod
+    def verify_password(user, raw_password):
+        """
+        Business Logic:
+        1. Hashed passwords are checked by Django's hashers (constant time).
+        2. Legacy rows still holding the plaintext password are compared in constant time.
+        3. A correct password stored in plaintext, or hashed with an outdated hasher
+           or work factor, is rehashed and saved on the spot.
+        """
+        if not raw_password:
+            return False
+
+        def rehash(raw):
+            user.password_hash = AuthService.hash_password(raw)
+            user.save(update_fields=['password_hash'])
+
+        try:
+            identify_hasher(user.password_hash)
+        except ValueError:
+            if not constant_time_compare(user.password_hash, raw_password):
+                return False
+            rehash(raw_password)
+            return True
+        return check_password(raw_password, user.password_hash, setter=rehash)
 
 
 class InventoryService:
@@ -10,17 +91,1256 @@ class InventoryService:
         1. Fetch stock for a specific outlet.
         2. Filter out items with 0 quantity.
         3. Sort by Expiry Date (FIFO logic).
+        With the stock ledger on, rows carry `available_quantity`: current_quantity
+        plus the sales not yet flushed to it (core/ledger.py).
         """
         stocks = OutletStock.objects.filter(
             outlet_id=outlet_id,
             current_quantity__gt=0  # Only show available stock
         ).select_related('batch', 'batch__product').order_by('batch__expiry_date')
 
+        if StockLedger.enabled():
+            stocks = stocks.annotate(available_quantity=StockLedger.available_expression()).filter(
+                available_quantity__gt=0
+            )
         return stocks
 
+    # Public field name -> ORM path, for sparse (values_list) stock responses
+    STOCK_FIELDS = {
+        'stock_id': 'stock_id',
+        'current_quantity': 'current_quantity',
+        'batch': 'batch_id',
+        'product_name': 'batch__product__product_name',
+        'batch_no': 'batch__batch_no',
+        'price': 'batch__product__base_price',
+    }
+
+    @staticmethod
+    def get_stock_page(outlet_id, after=None, limit=100, fields=None):
+        """
+        Business Logic:
+        1. Same rows and FIFO order as get_stock_for_outlet, with stock_id as tie-breaker.
+        2. Keyset: continue strictly after the (expiry_date, stock_id) of the last row seen,
+           so every page costs the same no matter how deep the client scrolls.
+        3. Only the requested columns are read, as tuples (no model instances).
+        Returns (rows, next_key); next_key is None on the last page.
+        """
+        query, names = InventoryService.stock_page_query(outlet_id, after, limit, fields)
+        return InventoryService.format_stock_page(list(query), names, limit)
+
+    @staticmethod
+    async def aget_stock_page(outlet_id, after=None, limit=100, fields=None):
+        """Async twin of get_stock_page (async ORM iteration)."""
+        query, names = InventoryService.stock_page_query(outlet_id, after, limit, fields)
+        return InventoryService.format_stock_page([row async for row in query], names, limit)
+
+    @staticmethod
+    def stock_page_query(outlet_id, after, limit, fields):
+        names = list(fields or InventoryService.STOCK_FIELDS)
+        stocks = InventoryService.get_stock_for_outlet(outlet_id).order_by('batch__expiry_date', 'stock_id')
+        if after:
+            expiry_date, stock_id = after
+            stocks = stocks.filter(
+                Q(batch__expiry_date__gt=expiry_date) | Q(batch__expiry_date=expiry_date, stock_id__gt=stock_id)
+            )
+        return stocks.values_list('batch__expiry_date', 'stock_id', *InventoryService.stock_paths(names))[:limit + 1], names
+
+    @staticmethod
+    def stock_paths(names):
+        """ORM paths for STOCK_FIELDS names (the ledger-aware quantity when it is on)."""
+        paths = [InventoryService.STOCK_FIELDS[name] for name in names]
+        if StockLedger.enabled():
+            paths = ['available_quantity' if path == 'current_quantity' else path for path in paths]
+        return paths
+
+    @staticmethod
+    def format_stock_page(page, names, limit):
+        next_key = page[limit - 1][:2] if len(page) > limit else None
+        rows = [
+            # Decimals are rendered as strings, like DRF's DecimalField
+            {name: str(value) if isinstance(value, Decimal) else value for name, value in zip(names, row[2:])}
+            for row in page[:limit]
+        ]
+        return rows, next_key
+
+    @staticmethod
+    def get_stock_validators(outlet_id):
+        """
+        Cheap change detector for an outlet's stock: (latest last_updated, row count).
+        Counts every row, not only positive ones, so a row selling out still changes it.
+        Writers that bypass save() must set last_updated themselves.
+        With the stock ledger on, pending journal entries count as changes too.
+        """
+        stocks = OutletStock.objects.filter(outlet_id=outlet_id)
+        if not StockLedger.enabled():
+            result = stocks.aggregate(last_modified=Max('last_updated'), rows=Count('stock_id'))
+            return result['last_modified'], result['rows']
+
+        result = stocks.aggregate(
+            last_modified=Max('last_updated'),
+            rows=Count('stock_id', distinct=True),
+            last_sold=Max('stockjournalentry__created_at'),
+            pending=Count('stockjournalentry'),
+        )
+        last_modified = max(filter(None, (result['last_modified'], result['last_sold'])), default=None)
+        return last_modified, f"{result['rows']}.{result['pending']}"
+
     @staticmethod
     def list_all_products():
         """
         Simple logic to get active products only.
         """
-        return Product.objects.filter(is_active=True)
\ No newline at end of file
+        return Product.objects.filter(is_active=True)
+
+    CATALOGUE_VERSION_KEY = 'catalogue.version'  # StatCounter row
+
+    @staticmethod
+    def get_catalogue_version():
+        """
+        Version of the product catalogue: roughly the time (ns) of the last Product
+        write. It is a StatCounter row on the primary, not a cache entry, so every
+        worker sees a bump as soon as the write commits even when the default cache
+        is per process. One primary-key read (migration 0016 creates the row).
+        """
+        counters = StatCounter.objects.using(router.db_for_write(StatCounter))
+        version = counters.filter(counter_key=InventoryService.CATALOGUE_VERSION_KEY).values_list(
+            'value', flat=True
+        ).first()
+        if version is None:
+            version = counters.get_or_create(
+                counter_key=InventoryService.CATALOGUE_VERSION_KEY, defaults={'value': time.time_ns()}
+            )[0].value
+        return version
+
+    @staticmethod
+    def bump_catalogue_version():
+        """
+        Move the version to now (ns), or one past it if this clock is behind.
+        Call inside the transaction of the Product write, so the two commit together.
+        """
+        now = time.time_ns()
+        versions = StatCounter.objects.filter(counter_key=InventoryService.CATALOGUE_VERSION_KEY)
+        bump = Greatest(F('value') + 1, Value(now, output_field=BigIntegerField()))
+        if not versions.update(value=bump):
+            try:
+                with transaction.atomic():
+                    StatCounter.objects.create(counter_key=InventoryService.CATALOGUE_VERSION_KEY, value=now)
+            except IntegrityError:
+                # Another writer created the row first
+                versions.update(value=bump)
+
+    CATALOGUE_KEY = 'catalogue:products:{version}:{category}'
+
+    @staticmethod
+    def catalogue_key(version, category=None):
+        return InventoryService.CATALOGUE_KEY.format(version=version, category=quote(category or '*'))
+
+    @staticmethod
+    def get_product_list_json(category=None, version=None):
+        """
+        Business Logic:
+        1. Look up the current catalogue version (one primary-key read), unless
+           the caller already has it (`version`, e.g. from the ETag).
+        2. Serve the active-product list (optionally one category) as JSON bytes
+           cached under that version, with no other ORM or serializer work.
+        3. On a miss, query, serialize and encode once, then cache the bytes.
+        A Product save/delete bumps the version (core/signals.py), so stale lists
+        are never read again, by any worker, and simply expire after CATALOGUE_CACHE_TTL.
+        """
+        if version is None:
+            version = InventoryService.get_catalogue_version()
+        key = InventoryService.catalogue_key(version, category)
+        catalogue = caches['catalogue']
+        payload = catalogue.get(key)
+        if payload is None:
+            payload = InventoryService.render_product_list(category)
+            catalogue.set(key, payload, settings.CATALOGUE_CACHE_TTL)
+        return payload
+
+    @staticmethod
+    async def aget_product_list_json(category=None, version=None):
+        """Async twin of get_product_list_json (the version read and a miss run in a worker thread)."""
+        if version is None:
+            version = await sync_to_async(InventoryService.get_catalogue_version)()
+        key = InventoryService.catalogue_key(version, category)
+        catalogue = caches['catalogue']
+        payload = await catalogue.aget(key)
+        if payload is None:
+            payload = await sync_to_async(InventoryService.render_product_list)(category)
+            await catalogue.aset(key, payload, settings.CATALOGUE_CACHE_TTL)
+        return payload
+
+    PRODUCT_FIELDS = ProductSerializer.Meta.fields
+
+    @staticmethod
+    def render_product_list(category=None):
+        """
+        ProductSerializer's output, built straight from value tuples (no model
+        instances or serializer fields) and encoded by the fast renderer.
+        """
+        names = InventoryService.PRODUCT_FIELDS
+        # Always the primary: the bytes are cached under the current version, so a
+        # lagging replica must not fill the cache
+        products = InventoryService.list_all_products().using(router.db_for_write(Product))
+        if category:
+            products = products.filter(category=category)
+        rows = products.values_list(*names)
+        with serializer_timer():
+            return render_json([
+                # Decimals are rendered as strings, like DRF's DecimalField
+                {name: str(value) if isinstance(value, Decimal) else value for name, value in zip(names, row)}
+                for row in rows
+            ])
+
+
+class StockLookupService:
+    """
+    Till lookups: sellable batches at an outlet by scanned batch_no or typed product name.
+    Answers are expected within STOCK_SEARCH_BUDGET_MS; slower lookups are logged.
+    """
+    DEFAULT_LIMIT = 20
+
+    @staticmethod
+    def search(outlet_id, text, limit=DEFAULT_LIMIT):
+        """
+        Business Logic:
+        1. Match batch_no by prefix (a full scan is an exact match and ranks first)
+           or any product name containing the text, case-insensitively. On
+           PostgreSQL the trigram indexes on UPPER(column::text) serve both
+           (migration 0014).
+        2. ONE query for the outlet's in-stock, unexpired rows among the matches,
+           FIFO order within each match rank.
+        Returns (rows, elapsed_ms); rows use the STOCK_FIELDS names.
+        """
+        started = time.perf_counter()
+        text = ' '.join(text.split())
+        stocks = InventoryService.get_stock_for_outlet(outlet_id).filter(batch__expiry_date__gte=timezone.localdate())
+        match = Q(batch__batch_no__istartswith=text) | Q(batch__product__product_name__icontains=text)
+
+        names = list(InventoryService.STOCK_FIELDS)
+        rows = (
+            stocks.filter(match)
+            .annotate(rank=Case(When(batch__batch_no__iexact=text, then=Value(0)), default=Value(1),
+                                output_field=IntegerField()))
+            .order_by('rank', 'batch__expiry_date', 'stock_id')
+            .values_list(*InventoryService.stock_paths(names))[:limit]
+        )
+        results = [
+            {name: str(value) if isinstance(value, Decimal) else value for name, value in zip(names, row)}
+            for row in rows
+        ]
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > settings.STOCK_SEARCH_BUDGET_MS:
+            logger.warning("Stock lookup %r at outlet %s took %.1f ms (budget %s ms)",
+                           text, outlet_id, elapsed_ms, settings.STOCK_SEARCH_BUDGET_MS)
+        return results, elapsed_ms
+
+
+class SalesService:
+    @staticmethod
+    @transaction.atomic
+    def checkout(outlet_id, items, payment_method, employee_id=None, customer_id=None,
+                 discount_amount=Decimal('0'), bill_no=None, reference_no=None):
+        """
+        Business Logic:
+        1. Allocate each product's quantity across its sellable batches, earliest
+           expiry first (same FIFO order as get_stock_for_outlet):
+           - by default the stock rows are locked and decremented with a single
+             conditional UPDATE (take_locked_stock);
+           - with STOCK_LEDGER_ENABLED they are allocated against the stock ledger,
+             with no row locks (core/ledger.py).
+        2. Write the Sale, all SaleItems (bulk) and the Payment.
+        3. Ledger only: journal the decrements, then reserve the units (last, so
+           nothing can fail after the reservation; take_ledger_stock).
+        4. Push the new quantities to the outlet's live feed after commit
+           (neither path goes through model signals).
+        Expired batches are never sold. An unknown or inactive outlet, or an
+        unknown customer, raises ValueError before anything is written.
+        """
+        if not Outlet.objects.filter(outlet_id=outlet_id, is_active=True).exists():
+            raise ValueError(f"Unknown or inactive outlet: {outlet_id}")
+        if customer_id is not None and not Customer.objects.filter(customer_id=customer_id).exists():
+            raise ValueError(f"Unknown customer: {customer_id}")
+
+        requested = defaultdict(int)
+        for item in items:
+            requested[item['product_id']] += item['quantity']
+
+        now = timezone.now()
+        ledger = StockLedger.enabled()
+        if ledger:
+            allocations = SalesService.allocate_ledger_stock(outlet_id, requested)
+        else:
+            allocations, left = SalesService.take_locked_stock(outlet_id, requested, now)
+
+        sale_items = [
+            SaleItem(
+                batch=stock.batch,
+                quantity=qty,
+                unit_price=stock.batch.product.base_price,
+                subtotal=stock.batch.product.base_price * qty,
+            )
+            for stock, qty in allocations
+        ]
+        total = sum((item.subtotal for item in sale_items), Decimal('0'))
+        discount = min(discount_amount or Decimal('0'), total)
+
+        sale = Sale.objects.create(
+            bill_no=bill_no or f"B{outlet_id}-{uuid.uuid4().hex[:12].upper()}",
+            outlet_id=outlet_id,
+            employee_id=employee_id,
+            customer_id=customer_id,
+            sale_date=now,
+            total_amount=total,
+            discount_amount=discount,
+            net_amount=total - discount,
+        )
+        for item in sale_items:
+            item.sale = sale
+        SaleItem.objects.bulk_create(sale_items)
+
+        Payment.objects.create(
+            sale=sale,
+            amount=sale.net_amount,
+            payment_method=payment_method,
+            payment_status=PaymentStatus.SUCCESS,
+            reference_no=reference_no,
+            payment_date=now,
+        )
+        SalesRollupService.apply_sale(sale, sale_items)
+        if ledger:
+            left = SalesService.take_ledger_stock(outlet_id, sale, allocations, now)
+
+        publish_on_commit(outlet_channel(outlet_id), stock_event(outlet_id, [
+            (stock.stock_id, stock.batch_id, left[stock.stock_id], now) for stock, _ in allocations
+        ]))
+
+        return sale, sale_items
+
+    @staticmethod
+    def sellable_stock(outlet_id, product_ids):
+        return (
+            OutletStock.objects
+            .filter(
+                outlet_id=outlet_id,
+                batch__product_id__in=product_ids,
+                batch__expiry_date__gte=timezone.localdate(),
+                current_quantity__gt=0,
+            )
+            .select_related('batch', 'batch__product')
+            .order_by('batch__expiry_date', 'stock_id')
+        )
+
+    @staticmethod
+    def allocate(stocks, requested, available):
+        """Spread each product's quantity over the rows in order; raises if any product is short."""
+        remaining = dict(requested)
+        allocations = []  # (stock, quantity)
+        for stock in stocks:
+            needed = remaining.get(stock.batch.product_id, 0)
+            if needed <= 0 or available[stock.stock_id] <= 0:
+                continue
+            take = min(needed, available[stock.stock_id])
+            allocations.append((stock, take))
+            remaining[stock.batch.product_id] = needed - take
+
+        short = [product_id for product_id, qty in remaining.items() if qty > 0]
+        if short:
+            raise InsufficientStockError(f"Insufficient stock for product(s): {sorted(short)}")
+        return allocations
+
+    @staticmethod
+    def take_locked_stock(outlet_id, requested, now):
+        """Lock the rows, allocate and decrement them. Returns (allocations, {stock_id: units left})."""
+        # Rows are always locked in (expiry, stock_id) order, so concurrent tills
+        # on the same outlet queue behind each other instead of deadlocking.
+        stocks = list(SalesService.sellable_stock(outlet_id, requested.keys()).select_for_update(of=('self',)))
+        allocations = SalesService.allocate(
+            stocks, requested, {stock.stock_id: stock.current_quantity for stock in stocks}
+        )
+
+        updated = OutletStock.objects.filter(
+            reduce(or_, (Q(stock_id=s.stock_id, current_quantity__gte=qty) for s, qty in allocations))
+        ).update(
+            current_quantity=Case(
+                *(When(stock_id=s.stock_id, then=F('current_quantity') - qty) for s, qty in allocations),
+                output_field=IntegerField(),
+            ),
+            last_updated=now,
+        )
+        if updated != len(allocations):
+            raise InsufficientStockError("Stock changed during checkout, please retry")
+        return allocations, {stock.stock_id: stock.current_quantity - qty for stock, qty in allocations}
+
+    @staticmethod
+    def allocate_ledger_stock(outlet_id, requested):
+        """Allocate against the stock ledger's availability (no row locks)."""
+        stocks = list(SalesService.sellable_stock(outlet_id, requested.keys()))
+        return SalesService.allocate(stocks, requested, StockLedger.available(stocks))
+
+    @staticmethod
+    def take_ledger_stock(outlet_id, sale, allocations, now):
+        """
+        Journal the sale's decrements, then reserve the units in the ledger.
+        Returns {stock_id: units left}; a failed reservation raises, rolling the sale back.
+        """
+        StockLedger.record(outlet_id, sale, allocations, now)
+        left = StockLedger.reserve({stock.stock_id: qty for stock, qty in allocations})
+        if left is None:
+            raise InsufficientStockError("Stock changed during checkout, please retry")
+        return left
+
+
+class FactoryStatsService:
+    """
+    Counters behind the factory dashboard.
+
+    Writes (see core/signals.py) bump StatCounter rows with F() updates and
+    log a FactoryActivity row. Reads cost one keyed lookup plus one indexed
+    LIMIT query and are cached for FACTORY_STATS_CACHE_TTL seconds.
+
+    Cache invalidation rules:
+    - any counter bump or activity entry drops the cached payload once the
+      surrounding transaction commits;
+    - the payload key includes today's date, so the "batches produced today"
+      figure rolls over at midnight without an explicit delete;
+    - bulk writes (queryset.update / bulk_create) skip signals and must call
+      the record_* helpers themselves or run `rebuild_factory_stats`.
+    """
+    CACHE_KEY = 'factory_stats:{day}'
+    ACTIVITY_LIMIT = 10
+
+    @staticmethod
+    def order_status_key(status):
+        return f'orders.status.{status}'
+
+    @staticmethod
+    def batches_produced_key(day):
+        return f'batches.produced.{day}'  # str(date) is ISO format
+
+    @staticmethod
+    def bump(key, delta=1):
+        if not delta:
+            return
+        updated = StatCounter.objects.filter(counter_key=key).update(value=F('value') + delta)
+        if not updated:
+            try:
+                with transaction.atomic():
+                    StatCounter.objects.create(counter_key=key, value=delta)
+            except IntegrityError:
+                # Another writer created the row first
+                StatCounter.objects.filter(counter_key=key).update(value=F('value') + delta)
+        FactoryStatsService.invalidate()
+
+        # Live feed: send the new value of dashboard counters (absolute, so replays are harmless)
+        keys = FactoryStatsService.dashboard_keys(timezone.localdate())
+        field = next((name for name, dashboard_key in keys.items() if dashboard_key == key), None)
+        if field:
+            transaction.on_commit(lambda: FactoryStatsService.publish_counter(field, key), robust=True)
+
+    @staticmethod
+    def publish_counter(field, key):
+        value = StatCounter.objects.filter(counter_key=key).values_list('value', flat=True).first() or 0
+        get_broker().publish(FACTORY_CHANNEL, {'type': 'stats', 'field': field, 'value': value})
+
+    @staticmethod
+    def record_activity(action, details):
+        entry = FactoryActivity.objects.create(action=action, details=details[:255])
+        FactoryStatsService.invalidate()
+        publish_on_commit(FACTORY_CHANNEL, {
+            'type': 'activity',
+            'id': entry.activity_id,
+            'action': entry.action,
+            'details': entry.details,
+            'time': entry.created_at.isoformat(),
+        })
+
+    @staticmethod
+    def invalidate():
+        key = FactoryStatsService.CACHE_KEY.format(day=timezone.localdate().isoformat())
+        transaction.on_commit(lambda: cache.delete(key))
+
+    @staticmethod
+    def get_dashboard_stats():
+        """
+        Business Logic:
+        1. Serve the cached payload when present.
+        2. Otherwise read today's counters by primary key (no COUNT(*)).
+        3. Attach the latest activity entries and cache the result.
+        """
+        today = timezone.localdate()
+        cache_key = FactoryStatsService.CACHE_KEY.format(day=today.isoformat())
+        stats = cache.get(cache_key)
+        if stats is not None:
+            return stats
+
+        keys = FactoryStatsService.dashboard_keys(today)
+        values = dict(FactoryStatsService.counter_query(keys))
+        activity = list(FactoryStatsService.recent_activity_query())
+        stats = FactoryStatsService.build_dashboard(keys, values, activity)
+
+        cache.set(cache_key, stats, settings.FACTORY_STATS_CACHE_TTL)
+        return stats
+
+    @staticmethod
+    async def aget_dashboard_stats():
+        """Async twin of get_dashboard_stats (async cache and ORM calls)."""
+        today = timezone.localdate()
+        cache_key = FactoryStatsService.CACHE_KEY.format(day=today.isoformat())
+        stats = await cache.aget(cache_key)
+        if stats is not None:
+            return stats
+
+        keys = FactoryStatsService.dashboard_keys(today)
+        values = {key: value async for key, value in FactoryStatsService.counter_query(keys)}
+        activity = [row async for row in FactoryStatsService.recent_activity_query()]
+        stats = FactoryStatsService.build_dashboard(keys, values, activity)
+
+        await cache.aset(cache_key, stats, settings.FACTORY_STATS_CACHE_TTL)
+        return stats
+
+    @staticmethod
+    def dashboard_keys(today):
+        return {
+            'pendingCustomerOrders': FactoryStatsService.order_status_key(OrderStatus.PENDING),
+            'batchesProduced': FactoryStatsService.batches_produced_key(today),
+            'dispatchedOrders': FactoryStatsService.order_status_key(OrderStatus.DISPATCHED),
+        }
+
+    # Both read the primary even under ReplicaReadMixin: the payload is cached,
+    # so a lagging replica would pin stale counters for the whole TTL
+    @staticmethod
+    def counter_query(keys):
+        return (
+            StatCounter.objects.using(router.db_for_write(StatCounter))
+            .filter(counter_key__in=keys.values()).values_list('counter_key', 'value')
+        )
+
+    @staticmethod
+    def recent_activity_query():
+        return (
+            FactoryActivity.objects.using(router.db_for_write(FactoryActivity))
+            .order_by('-activity_id')[:FactoryStatsService.ACTIVITY_LIMIT]
+        )
+
+    @staticmethod
+    def build_dashboard(keys, values, activity):
+        stats = {name: values.get(key, 0) for name, key in keys.items()}
+        stats['recentActivity'] = [
+            {
+                'id': entry.activity_id,
+                'action': entry.action,
+                'details': entry.details,
+                'time': entry.created_at.isoformat(),
+            }
+            for entry in activity
+        ]
+        return stats
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild():
+        """
+        Recompute every counter from the source tables (one grouped query each).
+        Used after bulk loads and by the data migration that seeds the table.
+        """
+        counters = {
+            FactoryStatsService.order_status_key(row['status']): row['total']
+            for row in CustomerOrder.objects.values('status').annotate(total=Count('order_id')).order_by()
+        }
+        counters.update({
+            FactoryStatsService.batches_produced_key(row['manufactured_date']): row['total']
+            for row in Batch.objects.values('manufactured_date').annotate(total=Count('batch_id')).order_by()
+        })
+
+        StatCounter.objects.filter(
+            Q(counter_key__startswith='orders.status.') | Q(counter_key__startswith='batches.produced.')
+        ).delete()
+        StatCounter.objects.bulk_create([StatCounter(counter_key=k, value=v) for k, v in counters.items()])
+        FactoryStatsService.invalidate()
+        return counters
+
+
+class ExpiryService:
+    # Postgres: lock one chunk of expired rows and zero them in a single
+    # UPDATE ... FROM, returning the quantity each row held before.
+    SWEEP_SQL = """
+        WITH expired AS (
+            SELECT s.stock_id, s.current_quantity
+            FROM outlet_stock s
+            JOIN batches b ON b.batch_id = s.batch_id
+            WHERE b.expiry_date < %s AND s.current_quantity > 0 AND s.stock_id > %s
+            ORDER BY s.stock_id
+            LIMIT %s
+            FOR UPDATE OF s
+        )
+        UPDATE outlet_stock AS s
+        SET current_quantity = 0, last_updated = %s
+        FROM expired
+        WHERE s.stock_id = expired.stock_id
+        RETURNING s.stock_id, s.outlet_id, s.batch_id, expired.current_quantity
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def sweep_chunk(cutoff, after=0, limit=5000):
+        """
+        Business Logic:
+        1. Take up to `limit` stock rows with stock_id > `after` whose batch expired before `cutoff`.
+        2. Zero them in one UPDATE (bumping last_updated for ETags).
+        3. Record matching EXPIRED_AUTOMATIC Wastage rows with one bulk_create.
+        4. Push the zeroed rows to each outlet's live feed after commit.
+        Returns the swept (stock_id, outlet_id, batch_id, quantity) tuples, in stock_id order.
+        """
+        now = timezone.now()
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(ExpiryService.SWEEP_SQL, [cutoff, after, limit, now])
+                rows = sorted(cursor.fetchall())
+        else:
+            # Portable fallback (e.g. SQLite in development): select, then one UPDATE
+            rows = list(
+                OutletStock.objects.select_for_update()
+                .filter(batch__expiry_date__lt=cutoff, current_quantity__gt=0, stock_id__gt=after)
+                .order_by('stock_id')
+                .values_list('stock_id', 'outlet_id', 'batch_id', 'current_quantity')[:limit]
+            )
+            OutletStock.objects.filter(stock_id__in=[row[0] for row in rows]).update(
+                current_quantity=0, last_updated=now
+            )
+
+        Wastage.objects.bulk_create([
+            Wastage(
+                outlet_id=outlet_id,
+                batch_id=batch_id,
+                quantity=quantity,
+                reason=WastageReason.EXPIRED_AUTOMATIC,
+                recorded_at=now,
+                notes=f"Expired before {cutoff}",
+            )
+            for _, outlet_id, batch_id, quantity in rows
+        ])
+
+        by_outlet = defaultdict(list)
+        for stock_id, outlet_id, batch_id, _ in rows:
+            by_outlet[outlet_id].append((stock_id, batch_id, 0, now))
+        for outlet_id, changes in by_outlet.items():
+            publish_on_commit(outlet_channel(outlet_id), stock_event(outlet_id, changes))
+        return rows
+
+
+class BatchImportService:
+    FORMATS = ('json', 'csv', 'ndjson')
+
+    @staticmethod
+    def parse(text, fmt):
+        """
+        Turn a JSON array, CSV (with header) or NDJSON payload into a list of row dicts.
+        Raises ValueError on malformed input.
+        """
+        if fmt == 'json':
+            rows = json.loads(text)
+            if isinstance(rows, dict):
+                rows = rows.get('batches')
+            if not isinstance(rows, list):
+                raise ValueError("Expected a JSON array of batches")
+            return rows
+        if fmt == 'csv':
+            return list(csv.DictReader(io.StringIO(text)))
+        if fmt == 'ndjson':
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    @staticmethod
+    def import_rows(rows, first_row=1, batch_size=1000):
+        """
+        Business Logic:
+        1. Validate every row's fields (no queries).
+        2. ONE query for which product_ids exist, ONE for which batch_nos are taken;
+           also reject batch_nos repeated inside the payload.
+        3. bulk_create the valid rows in chunks of `batch_size`, all or nothing: a
+           batch_no taken by a concurrent import after step 2 raises IntegrityError.
+        4. Bump the factory stats counters (bulk_create skips signals) and queue the
+           follow-up work (core/tasks.py).
+        Returns (created_count, errors) where errors are {"row": n, "errors": {...}}.
+        """
+        errors = {}
+        valid = []
+        # One serializer instance for all rows (building its fields per row dominates otherwise)
+        validator = BatchImportRowSerializer()
+        for offset, row in enumerate(rows):
+            try:
+                valid.append((offset, validator.run_validation(row)))
+            except ValidationError as e:
+                errors[offset] = e.detail
+
+        product_ids = {data['product_id'] for _, data in valid}
+        batch_nos = [data['batch_no'] for _, data in valid]
+        known_products = set(Product.objects.filter(product_id__in=product_ids).values_list('product_id', flat=True))
+        taken = set(Batch.objects.filter(batch_no__in=batch_nos).values_list('batch_no', flat=True))
+        repeated = {batch_no for batch_no, count in Counter(batch_nos).items() if count > 1}
+
+        batches = []
+        for offset, data in valid:
+            if data['product_id'] not in known_products:
+                errors[offset] = {'product_id': ['Product does not exist.']}
+            elif data['batch_no'] in taken:
+                errors[offset] = {'batch_no': ['Batch number already exists.']}
+            elif data['batch_no'] in repeated:
+                errors[offset] = {'batch_no': ['Batch number is repeated in this import.']}
+            else:
+                batches.append(Batch(**data))
+
+        with transaction.atomic():
+            Batch.objects.bulk_create(batches, batch_size=batch_size)
+            for day, count in Counter(batch.manufactured_date for batch in batches).items():
+                FactoryStatsService.bump(FactoryStatsService.batches_produced_key(day), count)
+            if batches:
+                FactoryStatsService.record_activity('Batches Imported', f"{len(batches)} batches imported")
+                enqueue('batch.created', {'batch_ids': [batch.batch_id for batch in batches]})
+
+        return len(batches), [
+            {'row': offset + first_row, 'errors': row_errors} for offset, row_errors in sorted(errors.items())
+        ]
+
+
+class SalesRollupService:
+    # Portable upsert (Postgres and SQLite both support ON CONFLICT ... DO UPDATE)
+    UPSERT_SQL = """
+        INSERT INTO daily_sales_rollup
+            (outlet_id, product_id, sale_day, quantity, gross_amount, discount_amount, net_amount)
+        VALUES {values}
+        ON CONFLICT (outlet_id, product_id, sale_day) DO UPDATE SET
+            quantity = daily_sales_rollup.quantity + EXCLUDED.quantity,
+            gross_amount = daily_sales_rollup.gross_amount + EXCLUDED.gross_amount,
+            discount_amount = daily_sales_rollup.discount_amount + EXCLUDED.discount_amount,
+            net_amount = daily_sales_rollup.net_amount + EXCLUDED.net_amount
+    """
+    # Conflicts with the ROW EXCLUSIVE lock every upsert takes, but not with reads
+    LOCK_SQL = 'LOCK TABLE daily_sales_rollup IN SHARE ROW EXCLUSIVE MODE'
+
+    @staticmethod
+    def apply_sale(sale, sale_items):
+        """
+        Business Logic:
+        1. Sum the sale's lines per product.
+        2. Split the bill discount across products in proportion to their gross
+           (the last product takes the rounding remainder, so totals match the Sale).
+        3. Add everything to the day's rollup rows with ONE upsert statement, in
+           product_id order so concurrent sales lock shared rows in the same order.
+        """
+        gross = defaultdict(Decimal)
+        quantity = defaultdict(int)
+        for item in sale_items:
+            gross[item.batch.product_id] += item.subtotal
+            quantity[item.batch.product_id] += item.quantity
+
+        discount = sale.discount_amount or Decimal('0')
+        shares = {}
+        remaining = discount
+        products = sorted(gross)
+        for product_id in products[:-1]:
+            share = (discount * gross[product_id] / sale.total_amount).quantize(Decimal('0.01')) if sale.total_amount else Decimal('0')
+            shares[product_id] = share
+            remaining -= share
+        shares[products[-1]] = remaining
+
+        sale_day = timezone.localtime(sale.sale_date).date()
+        params = []
+        for product_id in products:
+            params += [sale.outlet_id, product_id, sale_day, quantity[product_id],
+                       gross[product_id], shares[product_id], gross[product_id] - shares[product_id]]
+        values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(products))
+        with connection.cursor() as cursor:
+            cursor.execute(SalesRollupService.UPSERT_SQL.format(values=values), params)
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(date_from, date_to):
+        """
+        Recompute the rollup for [date_from, date_to] from raw sales: delete the
+        range, then insert one grouped aggregate. Callers chunk long ranges.
+        Discounts are pro-rated before rounding here, so a product's discount may
+        differ by a cent from the per-sale split done by apply_sale.
+        Returns the number of rollup rows written.
+
+        A range reaching yesterday or today can still be taking sales, so the
+        rebuild is made exclusive with apply_sale: on PostgreSQL it locks the table
+        against upserts (which waits for sales in flight and holds new ones until
+        it commits); SQLite takes its write lock at the DELETE, before the
+        aggregate reads. Either way every sale is counted once, by the rebuild if
+        it committed first, by its own upsert otherwise.
+        """
+        if date_to >= timezone.localdate() - datetime.timedelta(days=1) and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(SalesRollupService.LOCK_SQL)
+        DailySalesRollup.objects.filter(sale_day__gte=date_from, sale_day__lte=date_to).delete()
+
+        start = timezone.make_aware(datetime.datetime.combine(date_from, datetime.time.min))
+        end = timezone.make_aware(datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min))
+        money = DecimalField(max_digits=14, decimal_places=2)
+
+        rows = (
+            SaleItem.objects.filter(
+                sale__status=SaleStatus.COMPLETED, sale__sale_date__gte=start, sale__sale_date__lt=end
+            )
+            .annotate(sale_day=TruncDate('sale__sale_date'))
+            .values('sale__outlet_id', 'batch__product_id', 'sale_day')
+            .annotate(
+                units=Sum('quantity'),
+                gross=Sum('subtotal'),
+                discount=Sum(Case(
+                    When(sale__total_amount__gt=0,
+                         then=F('subtotal') * F('sale__discount_amount') / F('sale__total_amount')),
+                    default=Value(0),
+                    output_field=money,
+                )),
+            )
+            .order_by()
+        )
+
+        rollups = []
+        for row in rows:
+            discount = Decimal(row['discount'] or 0).quantize(Decimal('0.01'))
+            rollups.append(DailySalesRollup(
+                outlet_id=row['sale__outlet_id'],
+                product_id=row['batch__product_id'],
+                sale_day=row['sale_day'],
+                quantity=row['units'],
+                gross_amount=row['gross'],
+                discount_amount=discount,
+                net_amount=row['gross'] - discount,
+            ))
+        DailySalesRollup.objects.bulk_create(rollups, batch_size=5000)
+        return len(rollups)
+
+
+class OrderSchedulingService:
+    """
+    Customer advance orders against daily factory capacity.
+
+    ProductionCapacity holds units per product per day (no row = unlimited).
+    CapacityReservation holds the units already promised per (pickup_date, product)
+    and is adjusted as orders are placed, cancelled or moved (place_order and
+    core/signals.py), so checking an order costs keyed lookups rather than
+    re-aggregating every order for the day. rebuild_reservations repairs drift.
+    """
+    # Statuses that hold capacity; QUEUED and CANCELLED orders do not
+    RESERVING_STATUSES = (
+        OrderStatus.PENDING, OrderStatus.PREPARING, OrderStatus.READY_FOR_PICKUP,
+        OrderStatus.COMPLETED, OrderStatus.DISPATCHED,
+    )
+    # Statuses still waiting to be produced
+    TO_PRODUCE_STATUSES = (OrderStatus.PENDING, OrderStatus.PREPARING)
+    MIN_LEAD_TIME = datetime.timedelta(hours=24)
+
+    # Portable upsert (Postgres and SQLite both support ON CONFLICT ... DO UPDATE).
+    # Selecting from production_capacity skips unlimited products and writes the
+    # rows in product_id order, the order place_order locks capacity rows in.
+    # (SQLite needs the WHERE to parse INSERT ... SELECT ... ON CONFLICT.)
+    UPSERT_SQL = """
+        INSERT INTO capacity_reservations (pickup_date, product_id, reserved_quantity)
+        SELECT %s, product_id, CASE product_id {cases} END
+        FROM production_capacity
+        WHERE product_id IN ({product_ids})
+        ORDER BY product_id
+        ON CONFLICT (pickup_date, product_id) DO UPDATE SET
+            reserved_quantity = capacity_reservations.reserved_quantity + EXCLUDED.reserved_quantity
+    """
+
+    @staticmethod
+    def earliest_pickup_date():
+        """Orders must be placed at least 24 hours before pickup."""
+        return (timezone.localtime() + OrderSchedulingService.MIN_LEAD_TIME).date()
+
+    @staticmethod
+    def adjust_reservations(pickup_date, quantities, sign=1):
+        """
+        Add (sign=1) or release (sign=-1) {product_id: quantity} for one date with ONE
+        upsert. Only capacity-limited products are tracked, so giving a product a
+        ProductionCapacity row later needs rebuild_capacity_reservations.
+        """
+        quantities = {product_id: qty for product_id, qty in sorted(quantities.items()) if qty}
+        if not quantities:
+            return
+        params = [pickup_date]
+        for product_id, qty in quantities.items():
+            params += [product_id, sign * qty]
+        params += list(quantities)
+        sql = OrderSchedulingService.UPSERT_SQL.format(
+            cases=' '.join(['WHEN %s THEN %s'] * len(quantities)),
+            product_ids=', '.join(['%s'] * len(quantities)),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    @staticmethod
+    def remaining_capacity(pickup_date, product_ids, lock=False):
+        """
+        {product_id: units still free on pickup_date} for the capacity-limited products
+        among product_ids (unlimited ones are left out). With lock=True the capacity
+        rows are locked, which serializes orders competing for the same products.
+        """
+        capacities = ProductionCapacity.objects.filter(product_id__in=product_ids).order_by('product_id')
+        if lock:
+            capacities = capacities.select_for_update()
+        capacities = dict(capacities.values_list('product_id', 'daily_capacity'))
+        if not capacities:
+            return {}
+        reserved = dict(
+            CapacityReservation.objects.filter(pickup_date=pickup_date, product_id__in=capacities)
+            .values_list('product_id', 'reserved_quantity')
+        )
+        return {product_id: capacity - reserved.get(product_id, 0) for product_id, capacity in capacities.items()}
+
+    @staticmethod
+    @transaction.atomic
+    def place_order(customer_id, outlet_id, pickup_date, items, special_instructions=None, queue_if_full=False):
+        """
+        Business Logic:
+        1. Enforce the 24-hour lead time, check the customer and the (active) outlet,
+           and price the lines from active products (one query each).
+        2. Lock the products' capacity rows and read the date's reservations by key.
+        3. Within capacity: create the order as PENDING and add its quantities to the
+           reservations with one upsert.
+        4. Over capacity: raise CapacityExceededError, or (queue_if_full) create the
+           order as QUEUED without reserving; promote_queued picks it up when capacity frees.
+        Returns (order, order_items).
+        """
+        if pickup_date < OrderSchedulingService.earliest_pickup_date():
+            raise ValueError("Orders must be placed at least 24 hours before pickup")
+        if not Customer.objects.filter(customer_id=customer_id).exists():
+            raise ValueError(f"Unknown customer: {customer_id}")
+        if not Outlet.objects.filter(outlet_id=outlet_id, is_active=True).exists():
+            raise ValueError(f"Unknown or inactive outlet: {outlet_id}")
+
+        requested = defaultdict(int)
+        for item in items:
+            requested[item['product_id']] += item['quantity']
+        prices = dict(
+            Product.objects.filter(product_id__in=requested, is_active=True).values_list('product_id', 'base_price')
+        )
+        unknown = sorted(set(requested) - set(prices))
+        if unknown:
+            raise ValueError(f"Unknown or inactive product(s): {unknown}")
+
+        remaining = OrderSchedulingService.remaining_capacity(pickup_date, requested, lock=True)
+        shortages = {
+            product_id: (requested[product_id], max(free, 0))
+            for product_id, free in remaining.items() if requested[product_id] > free
+        }
+        if shortages and not queue_if_full:
+            raise CapacityExceededError(shortages)
+
+        order = CustomerOrder.objects.create(
+            customer_id=customer_id,
+            outlet_id=outlet_id,
+            pickup_date=pickup_date,
+            status=OrderStatus.QUEUED if shortages else OrderStatus.PENDING,
+            total_amount=sum((prices[product_id] * qty for product_id, qty in requested.items()), Decimal('0')),
+            special_instructions=special_instructions,
+        )
+        order_items = CustomerOrderItem.objects.bulk_create([
+            CustomerOrderItem(order=order, product_id=product_id, quantity=qty, unit_price=prices[product_id])
+            for product_id, qty in requested.items()
+        ])
+        if not shortages:
+            OrderSchedulingService.adjust_reservations(pickup_date, requested)
+        return order, order_items
+
+    @staticmethod
+    def order_quantities(order_ids):
+        """{order_id: {product_id: quantity}} for the given orders (one query)."""
+        quantities = defaultdict(lambda: defaultdict(int))
+        rows = CustomerOrderItem.objects.filter(order_id__in=order_ids).values_list('order_id', 'product_id', 'quantity')
+        for order_id, product_id, qty in rows:
+            quantities[order_id][product_id] += qty
+        return quantities
+
+    @staticmethod
+    def order_changed(order, old_status, old_pickup_date):
+        """
+        Keep reservations in step with an existing order's status or pickup date
+        (called from core/signals.py). Releasing capacity promotes queued orders.
+        """
+        held_before = old_status in OrderSchedulingService.RESERVING_STATUSES
+        held_after = order.status in OrderSchedulingService.RESERVING_STATUSES
+        if not (held_before or held_after) or (held_before == held_after and old_pickup_date == order.pickup_date):
+            return
+        quantities = OrderSchedulingService.order_quantities([order.order_id])[order.order_id]
+        if held_before:
+            OrderSchedulingService.adjust_reservations(old_pickup_date, quantities, sign=-1)
+        if held_after:
+            OrderSchedulingService.adjust_reservations(order.pickup_date, quantities)
+        if held_before:
+            OrderSchedulingService.promote_queued(old_pickup_date)
+
+    @staticmethod
+    def order_deleted(order):
+        """Release a deleted order's reservation (called before its items are deleted)."""
+        if order.status in OrderSchedulingService.RESERVING_STATUSES:
+            quantities = OrderSchedulingService.order_quantities([order.order_id])[order.order_id]
+            OrderSchedulingService.adjust_reservations(order.pickup_date, quantities, sign=-1)
+            OrderSchedulingService.promote_queued(order.pickup_date)
+
+    @staticmethod
+    @transaction.atomic
+    def promote_queued(pickup_date):
+        """
+        Move QUEUED orders for pickup_date to PENDING, oldest first, while their
+        products fit in the remaining capacity. Saving the status reserves it (signals).
+        Returns the promoted order ids.
+        """
+        queued = list(
+            CustomerOrder.objects.filter(pickup_date=pickup_date, status=OrderStatus.QUEUED).order_by('order_id')
+        )
+        if not queued:
+            return []
+        quantities = OrderSchedulingService.order_quantities([order.order_id for order in queued])
+        product_ids = {product_id for lines in quantities.values() for product_id in lines}
+        remaining = OrderSchedulingService.remaining_capacity(pickup_date, product_ids, lock=True)
+
+        promoted = []
+        for order in queued:
+            lines = quantities[order.order_id]
+            if all(qty <= remaining.get(product_id, qty) for product_id, qty in lines.items()):
+                for product_id, qty in lines.items():
+                    if product_id in remaining:
+                        remaining[product_id] -= qty
+                order.status = OrderStatus.PENDING
+                order.save(update_fields=['status'])
+                promoted.append(order.order_id)
+        return promoted
+
+    @staticmethod
+    def production_plan(date_from, date_to):
+        """
+        Business Logic:
+        1. ONE grouped query over order lines per (pickup_date, product): units still
+           to produce, units holding capacity, and units queued over capacity.
+        2. Attach each product's daily capacity and what is left of it.
+        """
+        status = 'order__status'
+        rows = (
+            CustomerOrderItem.objects
+            .filter(order__pickup_date__range=(date_from, date_to))
+            .exclude(**{status: OrderStatus.CANCELLED})
+            .values('order__pickup_date', 'product_id', 'product__product_name')
+            .annotate(
+                to_produce=Sum('quantity', filter=Q(**{f'{status}__in': OrderSchedulingService.TO_PRODUCE_STATUSES})),
+                reserved=Sum('quantity', filter=Q(**{f'{status}__in': OrderSchedulingService.RESERVING_STATUSES})),
+                queued=Sum('quantity', filter=Q(**{status: OrderStatus.QUEUED})),
+            )
+            .order_by('order__pickup_date', 'product_id')
+        )
+        rows = list(rows)
+        capacities = dict(
+            ProductionCapacity.objects.filter(product_id__in={row['product_id'] for row in rows})
+            .values_list('product_id', 'daily_capacity')
+        )
+        plan = []
+        for row in rows:
+            capacity = capacities.get(row['product_id'])
+            reserved = row['reserved'] or 0
+            plan.append({
+                'pickup_date': row['order__pickup_date'],
+                'product_id': row['product_id'],
+                'product_name': row['product__product_name'],
+                'to_produce': row['to_produce'] or 0,
+                'reserved': reserved,
+                'queued': row['queued'] or 0,
+                'daily_capacity': capacity,
+                'remaining_capacity': None if capacity is None else capacity - reserved,
+            })
+        return plan
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_reservations(date_from):
+        """Recompute reservations from pickup date `date_from` onwards (one grouped query)."""
+        totals = (
+            CustomerOrderItem.objects
+            .filter(order__pickup_date__gte=date_from, order__status__in=OrderSchedulingService.RESERVING_STATUSES,
+                    product__productioncapacity__isnull=False)
+            .values('order__pickup_date', 'product_id')
+            .annotate(total=Sum('quantity'))
+            .order_by()
+        )
+        CapacityReservation.objects.filter(pickup_date__gte=date_from).delete()
+        reservations = CapacityReservation.objects.bulk_create([
+            CapacityReservation(pickup_date=row['order__pickup_date'], product_id=row['product_id'],
+                                reserved_quantity=row['total'])
+            for row in totals
+        ])
+        return len(reservations)
+
+
+class DispatchService:
+    """
+    Factory to outlet transfers. A manifest splits batches across outlets; every
+    (outlet, batch) stock row is upserted with ONE bulk_create(update_conflicts=True),
+    then the outlets receive their lines. The query count does not grow with the
+    number of outlets or batches.
+    """
+    OPEN_RESTOCK_STATUSES = (RestockStatus.GENERATED, RestockStatus.SENT_TO_FACTORY)
+
+    @staticmethod
+    def split_evenly(quantity, outlet_ids):
+        """{outlet_id: share}; the remainder goes one unit each to the first outlets."""
+        share, extra = divmod(quantity, len(outlet_ids))
+        split = {outlet_id: share + (1 if i < extra else 0) for i, outlet_id in enumerate(outlet_ids)}
+        return {outlet_id: qty for outlet_id, qty in split.items() if qty}
+
+    @staticmethod
+    @transaction.atomic
+    def dispatch(items, dispatched_by=None, notes=None, receive=True):
+        """
+        items: [{'batch_id': .., 'allocations': {outlet_id: quantity}}
+                or {'batch_id': .., 'outlet_ids': [..]}]   (split what is left evenly)
+
+        Business Logic:
+        1. Lock the batches (so two dispatches of one batch cannot both spend it) and
+           sum what earlier manifests already took from them (one grouped query).
+        2. Allocations must fit in what is left of quantity_produced; expired batches
+           and unknown or inactive outlets are rejected.
+        3. Write the manifest and all its lines (bulk).
+        4. Lock the outlets' existing rows for these batches, then upsert every
+           (outlet, batch) pair with ONE bulk_create(update_conflicts=True):
+           existing rows are topped up, missing rows are created.
+        5. Push the new quantities to each outlet's live feed after commit (the bulk
+           write skips model signals), then receive every outlet's lines unless
+           receive=False (their open restock requests become DISPATCHED instead).
+        Returns (manifest, lines).
+        """
+        batch_ids = [item['batch_id'] for item in items]
+        if len(set(batch_ids)) != len(batch_ids):
+            raise ValueError("Each batch may appear only once per dispatch")
+        batches = {
+            batch.batch_id: batch
+            for batch in Batch.objects.select_for_update().filter(batch_id__in=batch_ids).order_by('batch_id')
+        }
+        missing = sorted(set(batch_ids) - set(batches))
+        if missing:
+            raise ValueError(f"Unknown batch(es): {missing}")
+        expired = sorted(batch_id for batch_id, batch in batches.items() if batch.expiry_date < timezone.localdate())
+        if expired:
+            raise ValueError(f"Expired batch(es) cannot be dispatched: {expired}")
+        taken = dict(
+            DispatchLine.objects.filter(batch_id__in=batch_ids)
+            .values('batch_id').annotate(total=Sum('quantity')).values_list('batch_id', 'total')
+        )
+
+        quantities = {}  # (outlet_id, batch_id) -> quantity
+        for item in items:
+            batch = batches[item['batch_id']]
+            left = batch.quantity_produced - taken.get(batch.batch_id, 0)
+            if 'outlet_ids' in item:
+                allocations = DispatchService.split_evenly(max(left, 0), item['outlet_ids'])
+            else:
+                allocations = item['allocations']
+            if sum(allocations.values()) > left:
+                raise ValueError(
+                    f"Batch {batch.batch_no}: {sum(allocations.values())} requested, only {max(left, 0)} left to dispatch"
+                )
+            for outlet_id, qty in allocations.items():
+                quantities[outlet_id, batch.batch_id] = qty
+        if not quantities:
+            raise ValueError("Nothing left to dispatch")
+
+        outlet_ids = {outlet_id for outlet_id, _ in quantities}
+        active = set(Outlet.objects.filter(outlet_id__in=outlet_ids, is_active=True).values_list('outlet_id', flat=True))
+        if outlet_ids - active:
+            raise ValueError(f"Unknown or inactive outlet(s): {sorted(outlet_ids - active)}")
+
+        now = timezone.now()
+        manifest = DispatchManifest.objects.create(dispatched_by=dispatched_by, dispatched_at=now, notes=notes)
+        lines = DispatchLine.objects.bulk_create([
+            DispatchLine(manifest=manifest, outlet_id=outlet_id, batch_id=batch_id, quantity=qty)
+            for (outlet_id, batch_id), qty in quantities.items()
+        ])
+
+        # Superset of the pairs (outlets x batches); the batch locks above keep new pairs from racing
+        existing = OutletStock.objects.select_for_update().filter(outlet_id__in=outlet_ids, batch_id__in=batch_ids)
+        if StockLedger.enabled():
+            existing = existing.annotate(available_quantity=StockLedger.available_expression())
+            existing = existing.values_list('outlet_id', 'batch_id', 'current_quantity', 'available_quantity')
+        else:
+            existing = existing.values_list('outlet_id', 'batch_id', 'current_quantity', 'current_quantity')
+        on_hand = {(outlet_id, batch_id): (current, available) for outlet_id, batch_id, current, available in existing}
+
+        stocks = OutletStock.objects.bulk_create(
+            [
+                OutletStock(
+                    outlet_id=outlet_id, batch_id=batch_id, last_updated=now,
+                    current_quantity=on_hand.get((outlet_id, batch_id), (0, 0))[0] + qty,
+                )
+                for (outlet_id, batch_id), qty in quantities.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['outlet', 'batch'],
+            update_fields=['current_quantity', 'last_updated'],
+        )
+
+        by_outlet = defaultdict(list)
+        for stock in stocks:
+            key = (stock.outlet_id, stock.batch_id)
+            by_outlet[stock.outlet_id].append((stock.stock_id, stock.batch_id, on_hand.get(key, (0, 0))[1] + quantities[key], now))
+        for outlet_id, changes in by_outlet.items():
+            publish_on_commit(outlet_channel(outlet_id), stock_event(outlet_id, changes))
+        if StockLedger.enabled():
+            stock_ids = [stock.stock_id for stock in stocks if stock.stock_id is not None]
+            transaction.on_commit(lambda: StockLedger.forget(stock_ids))
+
+        pairs = {(outlet_id, batches[batch_id].product_id) for outlet_id, batch_id in quantities}
+        if receive:
+            DispatchService.receive(manifest.manifest_id)
+            for line in lines:
+                line.status, line.received_at = DispatchStatus.RECEIVED, now
+        else:
+            RestockRequest.objects.filter(
+                reduce(or_, (Q(outlet_id=outlet_id, product_id=product_id) for outlet_id, product_id in pairs)),
+                status__in=DispatchService.OPEN_RESTOCK_STATUSES,
+            ).update(status=RestockStatus.DISPATCHED)
+        return manifest, lines
+
+    @staticmethod
+    @transaction.atomic
+    def receive(manifest_id, outlet_ids=None):
+        """
+        Business Logic:
+        1. Mark the manifest's lines still DISPATCHED for `outlet_ids` (default: all
+           outlets) RECEIVED with one UPDATE.
+        2. Close the open or dispatched restock requests for the received
+           (outlet, product) pairs with one UPDATE.
+        3. Tell each outlet's live feed what arrived.
+        Returns the number of lines received.
+        """
+        lines = DispatchLine.objects.filter(manifest_id=manifest_id, status=DispatchStatus.DISPATCHED)
+        if outlet_ids is not None:
+            lines = lines.filter(outlet_id__in=outlet_ids)
+        rows = list(
+            lines.select_for_update(of=('self',))
+            .values_list('line_id', 'outlet_id', 'batch_id', 'batch__product_id', 'quantity')
+        )
+        if not rows:
+            return 0
+
+        now = timezone.now()
+        DispatchLine.objects.filter(line_id__in=[row[0] for row in rows]).update(
+            status=DispatchStatus.RECEIVED, received_at=now
+        )
+        pairs = {(outlet_id, product_id) for _, outlet_id, _, product_id, _ in rows}
+        RestockRequest.objects.filter(
+            reduce(or_, (Q(outlet_id=outlet_id, product_id=product_id) for outlet_id, product_id in pairs)),
+            status__in=DispatchService.OPEN_RESTOCK_STATUSES + (RestockStatus.DISPATCHED,),
+        ).update(status=RestockStatus.RECEIVED)
+
+        received = defaultdict(list)
+        for _, outlet_id, batch_id, _, qty in rows:
+            received[outlet_id].append({'batch_id': batch_id, 'quantity': qty})
+        for outlet_id, batches in received.items():
+            publish_on_commit(outlet_channel(outlet_id), {
+                'type': 'dispatch', 'manifest_id': manifest_id, 'status': DispatchStatus.RECEIVED, 'batches': batches,
+            })
+        return len(rows)
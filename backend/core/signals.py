@@ -0,0 +1,150 @@
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from django.db import transaction
+from django.utils import timezone
+
+from .authentication import invalidate_cached_user
+from .ledger import StockLedger
+from .events import outlet_channel, publish_on_commit, stock_event
+from .models import Batch, CustomerOrder, OutletStock, Product, Role, User
+from .services import FactoryStatsService, InventoryService, OrderSchedulingService
+
+
+# ------------------------------------------
+# Remember the loaded values so post_save can tell what changed.
+# Read from __dict__ so deferred fields never trigger a query.
+# ------------------------------------------
+@receiver(post_init, sender=CustomerOrder)
+def remember_order_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.__dict__.get('status')
+    instance._loaded_pickup_date = instance.__dict__.get('pickup_date')
+
+
+@receiver(post_init, sender=Batch)
+def remember_batch_date(sender, instance, **kwargs):
+    instance._loaded_manufactured_date = instance.__dict__.get('manufactured_date')
+
+
+# ------------------------------------------
+# Daily capacity reservations (OrderSchedulingService).
+# Registered before the counters below, which reset _loaded_status.
+# ------------------------------------------
+@receiver(post_save, sender=CustomerOrder)
+def reserve_order_capacity(sender, instance, created, **kwargs):
+    # New orders are reserved by OrderSchedulingService.place_order
+    if not created and instance._loaded_status is not None:
+        OrderSchedulingService.order_changed(instance, instance._loaded_status, instance._loaded_pickup_date)
+    instance._loaded_pickup_date = instance.pickup_date
+
+
+@receiver(pre_delete, sender=CustomerOrder)  # while its items still exist
+def release_order_capacity(sender, instance, **kwargs):
+    OrderSchedulingService.order_deleted(instance)
+
+
+# ------------------------------------------
+# Factory dashboard counters
+# ------------------------------------------
+@receiver(post_save, sender=Batch)
+def count_batch_saved(sender, instance, created, **kwargs):
+    new_key = FactoryStatsService.batches_produced_key(instance.manufactured_date)
+    if created:
+        FactoryStatsService.bump(new_key, 1)
+        FactoryStatsService.record_activity(
+            'Batch Created', f"Batch {instance.batch_no} ({instance.quantity_produced} units)"
+        )
+    elif instance._loaded_manufactured_date and instance._loaded_manufactured_date != instance.manufactured_date:
+        FactoryStatsService.bump(FactoryStatsService.batches_produced_key(instance._loaded_manufactured_date), -1)
+        FactoryStatsService.bump(new_key, 1)
+    instance._loaded_manufactured_date = instance.manufactured_date
+
+
+@receiver(post_delete, sender=Batch)
+def count_batch_deleted(sender, instance, **kwargs):
+    FactoryStatsService.bump(FactoryStatsService.batches_produced_key(instance.manufactured_date), -1)
+
+
+@receiver(post_save, sender=CustomerOrder)
+def count_order_saved(sender, instance, created, **kwargs):
+    if created:
+        FactoryStatsService.bump(FactoryStatsService.order_status_key(instance.status), 1)
+        FactoryStatsService.record_activity('Order Placed', f"Order #{instance.order_id} for {instance.pickup_date}")
+    elif instance._loaded_status and instance._loaded_status != instance.status:
+        FactoryStatsService.bump(FactoryStatsService.order_status_key(instance._loaded_status), -1)
+        FactoryStatsService.bump(FactoryStatsService.order_status_key(instance.status), 1)
+        FactoryStatsService.record_activity('Order Updated', f"Order #{instance.order_id} is now {instance.status}")
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=CustomerOrder)
+def count_order_deleted(sender, instance, **kwargs):
+    FactoryStatsService.bump(FactoryStatsService.order_status_key(instance.status), -1)
+
+
+# ------------------------------------------
+# Live feed (core/events.py). Bulk writes (checkout, expiry sweep)
+# skip signals and publish from their services instead.
+# ------------------------------------------
+@receiver(post_save, sender=OutletStock)
+def publish_stock_saved(sender, instance, **kwargs):
+    publish_on_commit(outlet_channel(instance.outlet_id), stock_event(instance.outlet_id, [
+        (instance.stock_id, instance.batch_id, instance.current_quantity, instance.last_updated)
+    ]))
+
+
+@receiver(post_delete, sender=OutletStock)
+def publish_stock_deleted(sender, instance, **kwargs):
+    publish_on_commit(outlet_channel(instance.outlet_id), stock_event(instance.outlet_id, [
+        (instance.stock_id, instance.batch_id, 0, timezone.now())
+    ]))
+
+
+@receiver(post_save, sender=CustomerOrder)
+@receiver(post_delete, sender=CustomerOrder)
+def publish_order_status(sender, instance, **kwargs):
+    publish_on_commit(outlet_channel(instance.outlet_id), {
+        'type': 'order',
+        'order_id': instance.order_id,
+        'pickup_date': str(instance.pickup_date),
+        'status': instance.status if kwargs.get('signal') is post_save else None,
+    })
+
+
+# ------------------------------------------
+# Stock ledger: direct writes to a row change its availability
+# ------------------------------------------
+@receiver(post_save, sender=OutletStock)
+@receiver(post_delete, sender=OutletStock)
+def forget_ledger_stock(sender, instance, **kwargs):
+    if StockLedger.enabled():
+        stock_id = instance.stock_id  # delete() clears the pk before on_commit runs
+        transaction.on_commit(lambda: StockLedger.forget([stock_id]))
+
+
+# ------------------------------------------
+# Authentication cache
+# ------------------------------------------
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    user_id = instance.user_id  # delete() clears the pk before on_commit runs
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(pre_delete, sender=Role)  # before SET_NULL detaches the users
+def drop_cached_role_members(sender, instance, **kwargs):
+    user_ids = list(User.objects.filter(role_id=instance.role_id).values_list('user_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_cached_user(*user_ids))
+
+
+# ------------------------------------------
+# Product catalogue version (ETags, catalogue cache)
+# ------------------------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_catalogue_version(sender, instance, **kwargs):
+    # In the write's transaction: the version row commits (or rolls back) with the product
+    InventoryService.bump_catalogue_version()
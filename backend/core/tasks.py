@@ -0,0 +1,53 @@
+"""
+Outbox handlers (core/outbox.py): follow-up work run by run_outbox_worker,
+outside the request that caused it. Each gets every due payload of its topic
+in one call, so repeated events cost one run.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.mail import EmailMessage, get_connection
+from django.core.validators import validate_email
+
+from core.forecasting import RestockEngine
+from core.models import User
+from core.outbox import handler
+
+logger = logging.getLogger(__name__)
+
+
+@handler('employee.created')
+def send_welcome_emails(payloads):
+    """
+    One SMTP connection for the whole batch. Malformed addresses are skipped
+    rather than raised, so they cannot fail (and re-send) the rest of the batch.
+    """
+    users = User.objects.filter(user_id__in=[payload['user_id'] for payload in payloads]).exclude(email='')
+    messages = []
+    for user in users:
+        try:
+            validate_email(user.email)
+        except ValidationError:
+            logger.warning("Welcome email not sent to user %s: invalid address %r", user.user_id, user.email)
+            continue
+        messages.append(EmailMessage(
+            subject="Welcome to BakeryHub",
+            body=f"Hi {user.username},\n\nYour BakeryHub account is ready. Sign in with your username to get started.",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user.email],
+        ))
+    if messages:
+        get_connection().send_messages(messages)
+
+
+@handler('batch.created')
+def refresh_restock_suggestions(payloads):
+    """New production changes what can be dispatched: regenerate the GENERATED restock requests once."""
+    try:
+        engine = RestockEngine()
+    except ImproperlyConfigured as e:
+        logger.warning("Restock suggestions not refreshed: %s", e)
+        return
+    created, elapsed = engine.run()
+    logger.info("Refreshed %d restock suggestions after %d new batch event(s) in %.2fs", created, len(payloads), elapsed)
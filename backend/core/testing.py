@@ -0,0 +1,34 @@
+"""Test helpers shared by core/tests.py."""
+from django.core.cache import caches
+from core.metrics import query_budget
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+def client_for(user):
+    """APIClient that sends a valid JWT for `user`."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+class QueryBudgetMixin:
+    """
+    Views declare `query_budget = N` (queries per request, cold cache included),
+    or a dict of per-method budgets.
+    assertWithinQueryBudget fails the test when RequestMetricsMiddleware counted more.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for alias in caches:
+            caches[alias].clear()
+
+    def assertWithinQueryBudget(self, response):
+        view_class = getattr(response.resolver_match.func, 'view_class', None)
+        budget = query_budget(view_class, response.request.get('REQUEST_METHOD'))
+        self.assertIsNotNone(budget, f"{view_class.__name__ if view_class else response.resolver_match} declares no query_budget")
+        used = response.request_metrics.queries
+        self.assertLessEqual(
+            used, budget, f"{view_class.__name__} ran {used} queries, budget is {budget}"
+        )
@@ -2,8 +2,15 @@ from django.urls import path
 # Import from the new separate files
 from core.views.auth import LoginView, EmployeeRegisterView
 from core.views.products import ProductListView
-from core.views.factory import BatchCreateView, FactoryStatsView
-from core.views.stock import OutletStockView
+from core.views.factory import BatchCreateView, BatchBulkCreateView, FactoryStatsView
+from core.views.stock import OutletStockView, StockSearchView
+from core.views.sales import CheckoutView
+from core.views.reports import SalesExportView, OutletPerformanceView
+from core.views.metrics import MetricsView
+from core.views.async_reads import AsyncProductListView, AsyncOutletStockView, AsyncFactoryStatsView
+from core.views.events import OutletEventStreamView, FactoryEventStreamView
+from core.views.orders import CustomerOrderView, ProductionPlanView
+from core.views.dispatch import DispatchView, DispatchReceiveView
 
 urlpatterns = [
     # --- Auth ---
@@ -16,8 +23,35 @@ urlpatterns = [
 
     # --- Factory ---
     path('factory/create-batch', BatchCreateView.as_view(), name='create-batch'),
+    path('factory/create-batches', BatchBulkCreateView.as_view(), name='create-batches'),
     path('factory/stats', FactoryStatsView.as_view(), name='factory-stats'),
+    path('factory/production-plan', ProductionPlanView.as_view(), name='production-plan'),
+    path('factory/dispatch', DispatchView.as_view(), name='dispatch'),
+    path('factory/dispatch/<int:manifest_id>/receive', DispatchReceiveView.as_view(), name='dispatch-receive'),
 
     # --- Stock ---
     path('stock/<int:outlet_id>/', OutletStockView.as_view(), name='outlet-stock'),
+    path('stock/<int:outlet_id>/search', StockSearchView.as_view(), name='outlet-stock-search'),
+
+    # --- Sales (POS) ---
+    path('sales/checkout', CheckoutView.as_view(), name='sales-checkout'),
+
+    # --- Customer orders ---
+    path('orders', CustomerOrderView.as_view(), name='customer-orders'),
+
+    # --- Reports ---
+    path('reports/sales/export', SalesExportView.as_view(), name='sales-export'),
+    path('reports/outlet-performance', OutletPerformanceView.as_view(), name='outlet-performance'),
+
+    # --- Async reads (serve through the ASGI app) ---
+    path('async/products', AsyncProductListView.as_view(), name='async-product-list'),
+    path('async/stock/<int:outlet_id>/', AsyncOutletStockView.as_view(), name='async-outlet-stock'),
+    path('async/factory/stats', AsyncFactoryStatsView.as_view(), name='async-factory-stats'),
+
+    # --- Live events (Server-Sent Events, ASGI only) ---
+    path('events/outlet/<int:outlet_id>', OutletEventStreamView.as_view(), name='outlet-events'),
+    path('events/factory', FactoryEventStreamView.as_view(), name='factory-events'),
+
+    # --- Monitoring ---
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
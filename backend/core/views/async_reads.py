@@ -0,0 +1,99 @@
+"""
+Async versions of the read-heavy endpoints, for the ASGI app (bakeryhub.asgi).
+
+They are plain Django async views rather than DRF APIViews (DRF dispatch is
+synchronous), so a slow client waiting on the database does not hold a worker
+thread. Responses match the sync endpoints' payloads, including conditional GET.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
+from django.views.decorators.http import condition
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from core.authentication import CustomJWTAuthentication
+from core.conditional import (
+    catalogue_version, outlet_stock_etag, outlet_stock_last_modified, product_list_etag, product_list_last_modified,
+)
+from core.services import FactoryStatsService, InventoryService
+from core.views.stock import OutletStockView
+
+
+class AsyncAPIView(View):
+    """
+    Authenticates the JWT like the DRF views (IsAuthenticated), then calls `aget`.
+    Subclasses that set etag_func / last_modified_func (core/conditional.py, the
+    sync views' validators) answer unchanged polls with 304 like the sync views.
+    """
+    http_method_names = ['get', 'options']
+    etag_func = None
+    last_modified_func = None
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authenticate(request)
+        except (AuthenticationFailed, InvalidToken, TokenError) as e:
+            return JsonResponse({'detail': str(getattr(e, 'detail', e))}, status=401)
+        if request.user is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        if self.etag_func is None and self.last_modified_func is None:
+            return await self.aget(request, *args, **kwargs)
+        return await self.conditional_aget(request, *args, **kwargs)
+
+    async def conditional_aget(self, request, *args, **kwargs):
+        # The validators query the database, so they run in a worker thread; Django's
+        # condition() then answers 304 or calls aget and sets ETag / Last-Modified
+        etag, last_modified = await sync_to_async(self.validators)(request, *args, **kwargs)
+        aget = condition(
+            etag_func=lambda *_, **__: etag,
+            last_modified_func=lambda *_, **__: last_modified,
+        )(self.aget)
+        response = await aget(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def validators(self, request, *args, **kwargs):
+        etag = self.etag_func(request, *args, **kwargs) if self.etag_func else None
+        last_modified = self.last_modified_func(request, *args, **kwargs) if self.last_modified_func else None
+        return etag, last_modified
+
+    async def authenticate(self, request):
+        return await CustomJWTAuthentication().aauthenticate(request)
+
+
+class AsyncProductListView(AsyncAPIView):
+    etag_func = staticmethod(product_list_etag)
+    last_modified_func = staticmethod(product_list_last_modified)
+
+    async def aget(self, request):
+        # Already read by the ETag in the worker thread, so this hop runs no query
+        version = await sync_to_async(catalogue_version)(request)
+        payload = await InventoryService.aget_product_list_json(request.GET.get('category'), version=version)
+        return HttpResponse(payload, content_type='application/json')
+
+
+class AsyncOutletStockView(AsyncAPIView):
+    etag_func = staticmethod(outlet_stock_etag)
+    last_modified_func = staticmethod(outlet_stock_last_modified)
+
+    async def aget(self, request, outlet_id):
+        try:
+            after, page_size, fields = OutletStockView.page_params(request.GET)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        rows, next_key = await InventoryService.aget_stock_page(outlet_id, after=after, limit=page_size, fields=fields)
+
+        next_url = None
+        if next_key:
+            query = request.GET.copy()
+            query['cursor'] = OutletStockView.encode_cursor(next_key)
+            next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+        return JsonResponse({"next": next_url, "results": rows})
+
+
+class AsyncFactoryStatsView(AsyncAPIView):
+    async def aget(self, request):
+        return JsonResponse(await FactoryStatsService.aget_dashboard_stats())
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -5,18 +6,36 @@ from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from core.models import User, Role, Employee
 from core.permissions import IsAdmin
+from core.ratelimit import LoginRateLimit
+from core.services import AuthService
+from core.outbox import enqueue
 
 
 class LoginView(APIView):
+    """
+    Exchange username/password for a JWT.
+    Throttled per client IP and per username (LOGIN_RATE_LIMITS) before the
+    password is hashed, so a brute-force storm costs no hashing CPU.
+    An unknown username gets the same 401, after the same hashing work, as a
+    wrong password, so neither the body nor the timing tells which usernames exist.
+    """
     permission_classes = [AllowAny]
 
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
 
+        retry_after = LoginRateLimit.check(request, username)
+        if retry_after:
+            return Response(
+                {'error': 'Too many login attempts, try again later'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(retry_after)},
+            )
+
         try:
-            user = User.objects.get(username=username)
-            if user.password_hash == password:
+            user = User.objects.select_related('role').get(username=username)
+            if AuthService.verify_password(user, password):
                 refresh = RefreshToken.for_user(user)
                 role_name = user.role.role_name if user.role else "EMPLOYEE"
 
@@ -25,9 +44,15 @@ class LoginView(APIView):
                     'user': {'username': user.username, 'role': role_name}
                 }, status=status.HTTP_200_OK)
             else:
+                LoginRateLimit.record_failure(username)
                 return Response({'error': 'Invalid Credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=status.HTTP_401_UNAUTHORIZED)
+            # Hash anyway (as Django's ModelBackend does) so this is as slow as a wrong
+            # password; verify_password() rejects an empty one without hashing
+            if password:
+                AuthService.hash_password(password)
+            LoginRateLimit.record_failure(username)
+            return Response({'error': 'Invalid Credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
 class EmployeeRegisterView(APIView):
@@ -42,22 +67,27 @@ class EmployeeRegisterView(APIView):
             if User.objects.filter(username=data['username']).exists():
                 return Response({"error": "Username already taken"}, status=status.HTTP_400_BAD_REQUEST)
 
-            user = User.objects.create(
-                username=data['username'],
-                email=data['email'],
-                password_hash=data['password'],
-                role=role,
-                is_active=True
-            )
+            # Hash before the transaction so no locks are held while it runs
+            password_hash = AuthService.hash_password(data['password'])
+            with transaction.atomic():
+                user = User.objects.create(
+                    username=data['username'],
+                    email=data['email'],
+                    password_hash=password_hash,
+                    role=role,
+                    is_active=True
+                )
 
-            Employee.objects.create(
-                user=user,
-                first_name=data['first_name'],
-                last_name=data['last_name'],
-                nic=data['nic'],
-                contact_no=data['contact_no'],
-                hire_date=data['hire_date']
-            )
+                Employee.objects.create(
+                    user=user,
+                    first_name=data['first_name'],
+                    last_name=data['last_name'],
+                    nic=data['nic'],
+                    contact_no=data['contact_no'],
+                    hire_date=data['hire_date']
+                )
+                # Welcome notification, sent by the outbox worker after commit
+                enqueue('employee.created', {'user_id': user.user_id})
 
             return Response({"message": "Employee created successfully"}, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -0,0 +1,81 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from core.services import DispatchService
+from core.serializers import DispatchSerializer
+from core.models import DispatchManifest, Employee
+from core.permissions import IsAdmin, IsManager, IsFactoryDistributor, IsSalesperson
+from core.metrics import serializer_timer
+from core.idempotency import IdempotencyMixin
+
+
+class DispatchView(IdempotencyMixin, APIView):
+    """
+    Send batches from the factory to outlets in one manifest.
+    Body: {"batches": [{"batch_id": 1, "outlet_ids": [1, 2, 3]},
+                       {"batch_id": 2, "allocations": [{"outlet_id": 1, "quantity": 40}]}],
+           "notes": "...", "receive": true}
+    outlet_ids splits what is left of the batch evenly. With receive=false the lines
+    stay DISPATCHED until each outlet confirms them (the stock is booked either way).
+    """
+    permission_classes = [IsFactoryDistributor | IsManager | IsAdmin]
+    query_budget = 20  # 15, +5 with an Idempotency-Key; independent of outlets and batches
+
+    def post(self, request):
+        serializer = DispatchSerializer(data=request.data)
+        with serializer_timer():
+            valid = serializer.is_valid()
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        try:
+            manifest, lines = DispatchService.dispatch(
+                data['batches'],
+                dispatched_by=request.user,
+                notes=data.get('notes'),
+                receive=data['receive'],
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Dispatched",
+            "manifest_id": manifest.manifest_id,
+            "outlets": len({line.outlet_id for line in lines}),
+            "units": sum(line.quantity for line in lines),
+            "lines": [
+                {"batch_id": line.batch_id, "outlet_id": line.outlet_id, "quantity": line.quantity, "status": line.status}
+                for line in lines
+            ],
+        }, status=status.HTTP_201_CREATED)
+
+
+class DispatchReceiveView(APIView):
+    """
+    Confirm an outlet's lines of a manifest.
+    Managers and admins may confirm any outlet (all outlets if outlet_id is omitted);
+    outlet staff only confirm their own outlet's lines.
+    """
+    permission_classes = [IsSalesperson | IsManager | IsAdmin]
+    query_budget = 8
+
+    def post(self, request, manifest_id):
+        outlet_id = request.data.get('outlet_id')
+        try:
+            outlet_ids = None if outlet_id is None else [int(outlet_id)]
+        except (TypeError, ValueError):
+            return Response({"error": "Invalid outlet_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not (IsManager().has_permission(request, self) or IsAdmin().has_permission(request, self)):
+            own_outlet = Employee.objects.filter(user_id=request.user.user_id).values_list('outlet_id', flat=True).first()
+            if own_outlet is None or outlet_ids not in (None, [own_outlet]):
+                return Response({"error": "You can only receive stock for your own outlet"},
+                                status=status.HTTP_403_FORBIDDEN)
+            outlet_ids = [own_outlet]
+
+        if not DispatchManifest.objects.filter(manifest_id=manifest_id).exists():
+            return Response({"error": "Manifest not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        received = DispatchService.receive(manifest_id, outlet_ids)
+        return Response({"manifest_id": manifest_id, "received_lines": received})
@@ -0,0 +1,76 @@
+"""
+Server-Sent Events feeds that replace dashboard polling (see core/events.py).
+
+Serve them through the ASGI app (bakeryhub.asgi): each open stream is an idle
+coroutine, not a worker thread. Browsers' EventSource cannot set headers, so the
+access token may also be passed as ?token=<jwt>.
+
+Client flow: open the stream, wait for the `ready` event, load the snapshot
+(/api/stock/<outlet_id>/ or /api/factory/stats), then apply events as they
+arrive. On `resync` (or after a reconnect) reload the snapshot.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from core.authentication import CustomJWTAuthentication
+from core.events import FACTORY_CHANNEL, get_broker, outlet_channel
+from core.views.async_reads import AsyncAPIView
+
+
+class EventStreamView(AsyncAPIView):
+    """Streams the events of `channels`; override get_channels() when they depend on the URL."""
+    channels = ()
+    retry_ms = 3000
+
+    async def authenticate(self, request):
+        auth = CustomJWTAuthentication()
+        token = request.GET.get('token')
+        if auth.get_header(request) is None and token:
+            return await auth.aget_user(auth.get_validated_token(token.encode()))
+        return await auth.aauthenticate(request)
+
+    def get_channels(self, request, **kwargs):
+        if not self.channels:
+            raise ImproperlyConfigured(f"{type(self).__name__} needs `channels` or a get_channels() override")
+        return list(self.channels)
+
+    async def aget(self, request, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Event streams are only served by the ASGI app"}, status=501)
+        response = StreamingHttpResponse(
+            self.stream(self.get_channels(request, **kwargs)), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+        return response
+
+    async def stream(self, channels):
+        keepalive = settings.EVENT_STREAM_KEEPALIVE
+        async with get_broker().subscribe(*channels) as subscription:
+            yield f"retry: {self.retry_ms}\n" + self.encode({'type': 'ready', 'channels': list(channels)})
+            while True:
+                event = await subscription.get(timeout=keepalive)
+                # A comment line keeps proxies from closing an idle connection
+                yield self.encode(event) if event is not None else ": keepalive\n\n"
+
+    @staticmethod
+    def encode(event):
+        data = json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+class OutletEventStreamView(EventStreamView):
+    """Stock quantity changes and customer order status for one outlet (POS dashboard)."""
+
+    def get_channels(self, request, outlet_id):
+        return [outlet_channel(outlet_id)]
+
+
+class FactoryEventStreamView(EventStreamView):
+    """Factory dashboard counters and activity entries."""
+    channels = [FACTORY_CHANNEL]
@@ -1,34 +1,83 @@
+from django.db import IntegrityError, transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from core.serializers import BatchCreateSerializer
-from core.models import CustomerOrder, Batch
-from django.utils import timezone
+from core.services import FactoryStatsService, BatchImportService
+from core.metrics import serializer_timer
+from core.idempotency import IdempotencyMixin
+from core.outbox import enqueue
+from core.routers import ReplicaReadMixin
 
 
-class BatchCreateView(APIView):
+class BatchCreateView(IdempotencyMixin, APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = 16  # 11, +5 with an Idempotency-Key
 
     def post(self, request):
         serializer = BatchCreateSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
+        with serializer_timer():
+            valid = serializer.is_valid()
+        if valid:
+            try:
+                with transaction.atomic():
+                    batch = serializer.save()
+                    # Restock recalculation runs in the outbox worker, not in this request
+                    enqueue('batch.created', {'batch_ids': [batch.batch_id]})
+            except IntegrityError:
+                # The unique check above raced a concurrent insert of the same batch_no
+                return Response({"error": "Batch number already exists"}, status=status.HTTP_409_CONFLICT)
             return Response({"message": "Batch Created Successfully!"}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FactoryStatsView(APIView):
+class BatchBulkCreateView(IdempotencyMixin, APIView):
+    """
+    Create many batches in one request. Accepts a JSON array (or {"batches": [...]}),
+    CSV with a header row (text/csv) or NDJSON (application/x-ndjson).
+    Valid rows are saved; invalid ones are reported by row number.
+    """
     permission_classes = [IsAuthenticated]
+    # One manufactured_date: 9 (3 more while its counter row is missing); +1 per further
+    # date and per 1000 rows; +5 with an Idempotency-Key
+    query_budget = 17
+    max_rows = 10000
+    content_formats = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/ndjson': 'ndjson'}
+
+    def post(self, request):
+        # Drop parameters such as "; charset=utf-8"
+        fmt = self.content_formats.get(request.content_type.split(';')[0].strip().lower())
+        try:
+            if fmt:
+                rows = BatchImportService.parse(request.body.decode('utf-8'), fmt)
+            else:
+                rows = request.data.get('batches') if isinstance(request.data, dict) else request.data
+                if not isinstance(rows, list):
+                    raise ValueError("Expected a JSON array of batches")
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"error": f"Could not parse batches: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(rows) > self.max_rows:
+            return Response({"error": f"At most {self.max_rows} batches per request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            created, errors = BatchImportService.import_rows(rows)
+        except IntegrityError:
+            # A concurrent import took a batch_no after it was checked; nothing was saved
+            return Response(
+                {"error": "A batch number was taken by a concurrent import; nothing was saved, retry the request"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(
+            {"created": created, "errors": errors},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class FactoryStatsView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    query_budget = 3
 
     def get(self, request):
-        today = timezone.now().date()
-        pending = CustomerOrder.objects.filter(status='PENDING').count()
-        produced_today = Batch.objects.filter(manufactured_date=today).count()
-
-        return Response({
-            "pendingCustomerOrders": pending,
-            "batchesProduced": produced_today,
-            "dispatchedOrders": 0,
-            "recentActivity": []
-        })
\ No newline at end of file
+        return Response(FactoryStatsService.get_dashboard_stats())
\ No newline at end of file
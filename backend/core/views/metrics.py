@@ -0,0 +1,12 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from core.permissions import IsAdmin
+from core.metrics import registry
+
+
+class MetricsView(APIView):
+    """Per-route request histograms for this process (latency, DB time, serializer time, query count)."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(registry.snapshot())
@@ -0,0 +1,82 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from core.services import OrderSchedulingService, CapacityExceededError
+from core.serializers import CustomerOrderSerializer
+from core.models import Customer, OrderStatus
+from core.permissions import IsAdmin, IsManager, IsFactoryDistributor
+from core.idempotency import IdempotencyMixin
+from core.views.reports import parse_date_range
+
+
+class CustomerOrderView(IdempotencyMixin, APIView):
+    """
+    Place an advance order. Within the products' daily capacity -> 201 (PENDING);
+    over capacity -> 409 with the shortages, or 202 (QUEUED) with queue_if_full.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 22  # 17 (3 of them only while a status counter is missing), +5 with an Idempotency-Key
+
+    def post(self, request):
+        serializer = CustomerOrderSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        # Customers order for themselves; staff must say which customer
+        customer_id = Customer.objects.filter(user_id=request.user.user_id).values_list('customer_id', flat=True).first()
+        if customer_id is None:
+            customer_id = data.get('customer_id')
+            if customer_id is None:
+                return Response({"error": "A valid customer_id is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            order, order_items = OrderSchedulingService.place_order(
+                customer_id=customer_id,
+                outlet_id=data['outlet_id'],
+                pickup_date=data['pickup_date'],
+                items=data['items'],
+                special_instructions=data.get('special_instructions'),
+                queue_if_full=data['queue_if_full'],
+            )
+        except CapacityExceededError as e:
+            return Response({
+                "error": "Not enough production capacity for the pickup date",
+                "shortages": [
+                    {"product_id": product_id, "requested": requested, "remaining": remaining}
+                    for product_id, (requested, remaining) in sorted(e.shortages.items())
+                ],
+            }, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queued = order.status == OrderStatus.QUEUED
+        return Response({
+            "message": "Order queued until capacity frees up" if queued else "Order placed",
+            "order_id": order.order_id,
+            "status": order.status,
+            "pickup_date": str(order.pickup_date),
+            "total_amount": str(order.total_amount),
+            "items": [
+                {"product_id": item.product_id, "quantity": item.quantity, "unit_price": str(item.unit_price)}
+                for item in order_items
+            ],
+        }, status=status.HTTP_202_ACCEPTED if queued else status.HTTP_201_CREATED)
+
+
+class ProductionPlanView(APIView):
+    """
+    Units to produce per pickup date and product, with capacity use.
+    Query params: from, to (YYYY-MM-DD, inclusive)
+    """
+    permission_classes = [IsFactoryDistributor | IsManager | IsAdmin]
+    query_budget = 4
+
+    def get(self, request):
+        try:
+            date_from, date_to = parse_date_range(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        plan = OrderSchedulingService.production_plan(date_from, date_to)
+        return Response({"from": str(date_from), "to": str(date_to), "plan": plan})
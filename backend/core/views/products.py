@@ -1,21 +1,39 @@
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from core.services import InventoryService
 from core.serializers import ProductSerializer
+from core.conditional import catalogue_version, product_list_etag, product_list_last_modified
+from core.metrics import serializer_timer
+from core.idempotency import IdempotencyMixin
+from core.routers import ReplicaReadMixin
 
-class ProductListView(APIView):
+class ProductListView(ReplicaReadMixin, IdempotencyMixin, APIView):
+    """
+    Active products, optionally ?category=<name>.
+    GET returns the catalogue cache's pre-encoded JSON (see InventoryService.get_product_list_json).
+    """
     permission_classes = [IsAuthenticated]
+    query_budget = {'GET': 3, 'POST': 8}  # POST: 3, +5 with an Idempotency-Key
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=product_list_etag, last_modified_func=product_list_last_modified))
     def get(self, request):
-        products = InventoryService.list_all_products()
-        serializer = ProductSerializer(products, many=True)
-        return Response(serializer.data)
+        payload = InventoryService.get_product_list_json(
+            request.query_params.get('category'), version=catalogue_version(request)
+        )
+        return HttpResponse(payload, content_type='application/json')
 
     def post(self, request):
         serializer = ProductSerializer(data=request.data)
-        if serializer.is_valid():
+        with serializer_timer():
+            valid = serializer.is_valid()
+        if valid:
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
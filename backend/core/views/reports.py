@@ -0,0 +1,75 @@
+import datetime
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from core.permissions import IsAdmin, IsManager
+from core import reports
+
+
+def parse_date_range(params):
+    """?from=YYYY-MM-DD&to=YYYY-MM-DD, both inclusive, defaulting to today."""
+    today = timezone.localdate()
+    date_from = datetime.date.fromisoformat(params['from']) if params.get('from') else today
+    date_to = datetime.date.fromisoformat(params['to']) if params.get('to') else date_from
+    if date_to < date_from:
+        raise ValueError("'to' is before 'from'")
+    return date_from, date_to
+
+
+class SalesExportView(APIView):
+    """
+    Stream sale lines as CSV (default) or Parquet.
+    Query params: from, to (YYYY-MM-DD, inclusive), outlet_id, file_format=csv|parquet
+    ('format' is reserved by DRF for renderer selection.)
+    """
+    permission_classes = [IsManager | IsAdmin]
+
+    def get(self, request):
+        try:
+            date_from, date_to = parse_date_range(request.query_params)
+            outlet_id = int(request.query_params['outlet_id']) if request.query_params.get('outlet_id') else None
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in reports.EXPORT_FORMATS:
+            return Response({"error": "file_format must be csv or parquet"}, status=status.HTTP_400_BAD_REQUEST)
+        if fmt == 'parquet' and reports.pa is None:
+            return Response({"error": "Parquet export is not available on this server"}, status=status.HTTP_400_BAD_REQUEST)
+
+        content_type, extension = reports.EXPORT_FORMATS[fmt]
+        response = StreamingHttpResponse(
+            reports.export_sales(fmt, date_from, date_to, outlet_id), content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="sales_{date_from}_{date_to}.{extension}"'
+        return response
+
+
+
+class OutletPerformanceView(APIView):
+    """
+    Sales totals from the daily rollup.
+    Query params: from, to (YYYY-MM-DD, inclusive), outlet_id, group_by=outlet|product|day
+    """
+    permission_classes = [IsManager | IsAdmin]
+
+    def get(self, request):
+        try:
+            date_from, date_to = parse_date_range(request.query_params)
+            outlet_id = int(request.query_params['outlet_id']) if request.query_params.get('outlet_id') else None
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.query_params.get('group_by', 'outlet')
+        if group_by not in reports.PERFORMANCE_GROUPS:
+            return Response({"error": "group_by must be outlet, product or day"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "from": date_from,
+            "to": date_to,
+            "group_by": group_by,
+            "results": reports.outlet_performance(date_from, date_to, outlet_id, group_by),
+        })
@@ -0,0 +1,68 @@
+from django.db import IntegrityError
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from core.services import SalesService, InsufficientStockError
+from core.serializers import CheckoutSerializer
+from core.models import Employee, Sale
+from core.metrics import serializer_timer
+from core.permissions import IsAdmin, IsManager
+from core.idempotency import IdempotencyMixin
+
+
+class CheckoutView(IdempotencyMixin, APIView):
+    """
+    Ring up a sale.
+    Managers and admins may sell at any outlet; other staff only at the outlet
+    their employee record assigns them to.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 17  # 12 (11 without a customer_id), +5 with an Idempotency-Key
+
+    def post(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        with serializer_timer():
+            valid = serializer.is_valid()
+        if not valid:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        employee_id, own_outlet = (
+            Employee.objects.filter(user_id=request.user.user_id).values_list('employee_id', 'outlet_id').first()
+            or (None, None)
+        )
+        if not (IsManager().has_permission(request, self) or IsAdmin().has_permission(request, self)):
+            if own_outlet is None or serializer.validated_data['outlet_id'] != own_outlet:
+                return Response({"error": "You can only sell at your own outlet"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            sale, sale_items = SalesService.checkout(employee_id=employee_id, **serializer.validated_data)
+        except InsufficientStockError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            # Parties are validated up front, so only a duplicate bill_no is the client's doing
+            bill_no = serializer.validated_data.get('bill_no')
+            if bill_no and Sale.objects.filter(bill_no=bill_no).exists():
+                return Response({"error": "Bill number already used"}, status=status.HTTP_409_CONFLICT)
+            raise
+
+        return Response({
+            "message": "Sale completed",
+            "sale_id": sale.sale_id,
+            "bill_no": sale.bill_no,
+            "total_amount": str(sale.total_amount),
+            "discount_amount": str(sale.discount_amount),
+            "net_amount": str(sale.net_amount),
+            "items": [
+                {
+                    "batch_id": item.batch_id,
+                    "batch_no": item.batch.batch_no,
+                    "quantity": item.quantity,
+                    "unit_price": str(item.unit_price),
+                    "subtotal": str(item.subtotal),
+                }
+                for item in sale_items
+            ],
+        }, status=status.HTTP_201_CREATED)
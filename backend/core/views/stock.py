@@ -1,13 +1,115 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from core.services import InventoryService
-from core.serializers import OutletStockSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.urls import replace_query_param
+from core.services import InventoryService, StockLookupService
+from core.conditional import outlet_stock_etag, outlet_stock_last_modified
+from core.renderers import FastJSONRenderer
+from core.routers import ReplicaReadMixin
+
+
+class OutletStockView(ReplicaReadMixin, APIView):
+    """
+    Available stock for one outlet, FIFO order, keyset (cursor) paginated.
 
-class OutletStockView(APIView):
+    Query params:
+    - cursor: opaque value taken from the previous page's "next" link
+    - page_size: rows per page (default 100, max 500)
+    - fields: comma separated subset of InventoryService.STOCK_FIELDS
+
+    Supports conditional GET: an unchanged outlet answers 304 without reading rows.
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    query_budget = 4  # user, validators, catalogue version, page (a 304 skips the page)
+    page_size = 100
+    max_page_size = 500
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=outlet_stock_etag, last_modified_func=outlet_stock_last_modified))
     def get(self, request, outlet_id):
-        stocks = InventoryService.get_stock_for_outlet(outlet_id)
-        serializer = OutletStockSerializer(stocks, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        try:
+            after, page_size, fields = self.page_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, next_key = InventoryService.get_stock_page(outlet_id, after=after, limit=page_size, fields=fields)
+
+        next_url = None
+        if next_key:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', self.encode_cursor(next_key))
+        return Response({"next": next_url, "results": rows})
+
+    @classmethod
+    def page_params(cls, params):
+        """(after, page_size, fields) from the query params; ValueError carries the 400 message."""
+        try:
+            after = cls.decode_cursor(params.get('cursor'))
+            page_size = min(int(params.get('page_size', cls.page_size)), cls.max_page_size)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor or page_size")
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+
+        fields = None
+        if params.get('fields'):
+            fields = [name.strip() for name in params['fields'].split(',') if name.strip()]
+            unknown = [name for name in fields if name not in InventoryService.STOCK_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return after, page_size, fields
+
+    @staticmethod
+    def encode_cursor(key):
+        expiry_date, stock_id = key
+        raw = json.dumps([expiry_date.isoformat(), stock_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            expiry_date, stock_id = json.loads(raw)
+            return datetime.date.fromisoformat(expiry_date), int(stock_id)
+        except (binascii.Error, json.JSONDecodeError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+
+class StockSearchView(ReplicaReadMixin, APIView):
+    """
+    Till lookup: sellable batches at an outlet matching a scanned batch_no or typed product name.
+
+    Query params:
+    - q: batch_no (or its prefix) or part of a product name
+    - limit: rows to return (default 20, max 100)
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    query_budget = 3
+    max_limit = 100
+
+    def get(self, request, outlet_id):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', StockLookupService.DEFAULT_LIMIT)), self.max_limit)
+        except ValueError:
+            return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, elapsed_ms = StockLookupService.search(outlet_id, text, limit=limit)
+        return Response({"results": rows, "took_ms": round(elapsed_ms, 2)})